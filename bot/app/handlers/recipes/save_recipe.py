@@ -13,7 +13,10 @@ from bot.app.services.ingredients_parser import parse_ingredients
 from bot.app.services.parse_callback import parse_category
 from bot.app.services.save_recipe import save_recipe_service
 from bot.app.utils.context_helpers import get_db
-from packages.redis.repository import CategoryCacheRepository, RecipeCacheRepository
+from packages.redis.repository import (
+    CategoryCacheRepository,
+    RecipeCacheRepository,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -57,6 +60,7 @@ async def save_recipe(update: Update, context: PTBContext) -> int:
     description = draft.get('recipe', 'Не указано')
     ingredients = draft.get('ingredients', 'Не указано')
     video_url = draft.get('video_file_id', '')
+    video_hash = draft.get('video_hash') or None
     ingredients_raw = parse_ingredients(ingredients)
     user_id = cq.from_user.id if cq.from_user else None
 
@@ -77,6 +81,7 @@ async def save_recipe(update: Update, context: PTBContext) -> int:
                 category_id=category_id,
                 ingredients_raw=ingredients_raw,
                 video_url=video_url,
+                video_hash=video_hash,
             )
             await CategoryCacheRepository.invalidate_user_categories(
                 state.redis, user_id
@@ -17,6 +17,7 @@ from bot.app.handlers.recipes.recipes_menu import (
     upload_recipe,
 )
 from bot.app.handlers.recipes.save_recipe import save_recipe_handlers
+from bot.app.handlers.stats import pipeline_stats
 from bot.app.handlers.user import user_help, user_start
 from bot.app.handlers.video import video_link
 
@@ -34,6 +35,7 @@ def setup_handlers(app: Application) -> None:
     logger.info('Регистрация обработчиков...')
     app.add_handler(CommandHandler('start', user_start))
     app.add_handler(CommandHandler('help', user_help))
+    app.add_handler(CommandHandler('stats', pipeline_stats))
     # pattern='^(edit|delete)_recipe_(\d+)$'
     app.add_handler(conversation_edit_recipe())
     # pattern='^save_recipe$'
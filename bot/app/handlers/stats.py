@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import logging
+from html import escape
+from typing import Any
+
+from telegram import Update
+from telegram.constants import ParseMode
+
+from bot.app.core.types import PTBContext
+from packages.common_settings.settings import settings
+from packages.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _render_snapshot(snap: dict[str, Any]) -> str:
+    """Текстовый отчёт по метрикам: счётчики, текущие значения, тайминги."""
+    minutes = max(snap['uptime'] / 60, 1e-9)
+    lines = [f'uptime: {snap["uptime"] / 60:.1f} min', '', '# counters']
+    for name, value in sorted(snap['counters'].items()):
+        line = f'{name}: {value:g}'
+        if name.endswith('.completed'):
+            line += f' ({value / minutes:.2f}/min)'
+        lines.append(line)
+    lines += ['', '# gauges']
+    for name, value in sorted(snap['gauges'].items()):
+        lines.append(f'{name}: {value:g}')
+    lines += ['', '# timings (count / avg / max, s)']
+    for name, t in sorted(snap['timings'].items()):
+        lines.append(
+            f'{name}: {t["count"]} / {t["avg"]:.2f} / {t["max"]:.2f}'
+        )
+    return '\n'.join(lines)
+
+
+async def pipeline_stats(update: Update, context: PTBContext) -> None:
+    """
+    Команда /stats — метрики конвейера обработки видео.
+    Доступна только администратору (TELEGRAM_ADMIN_ID).
+    """
+    user = update.effective_user
+    msg = update.effective_message
+    if not user or not msg or user.id != settings.telegram.admin_id:
+        return
+    text = _render_snapshot(metrics.snapshot())
+    await msg.reply_text(
+        f'<pre>{escape(text)}</pre>', parse_mode=ParseMode.HTML
+    )
@@ -5,10 +5,12 @@ import logging
 import re
 from typing import Optional
 
+from redis.exceptions import RedisError
 from telegram import Message, MessageEntity, Update
 
 from bot.app.core.types import PTBContext
 from bot.app.services.video_pipeline import process_video_pipeline
+from bot.app.services.video_queue import QueueFullError
 
 logger = logging.getLogger(__name__)
 
@@ -60,4 +62,19 @@ async def video_link(update: Update, context: PTBContext) -> None:
         )
         return
     logger.debug(f'Пользователь отправил ссылку: {url}')
-    asyncio.create_task(process_video_pipeline(url, message, context))
+    queue = context.bot_data['state'].video_queue
+    if queue is None:
+        # очередь не поднята (например, без Redis) — обрабатываем сразу
+        asyncio.create_task(process_video_pipeline(url, message, context))
+        return
+    try:
+        await queue.submit(url, message)
+    except QueueFullError:
+        await message.reply_text(
+            '⏳ У вас уже много видео в обработке. '
+            'Дождитесь результата и пришлите ссылку ещё раз.'
+        )
+    except (RedisError, OSError) as e:
+        # очередь недоступна — не теряем ссылку, обрабатываем сразу
+        logger.warning('Очередь видео недоступна, обрабатываем сразу: %s', e)
+        asyncio.create_task(process_video_pipeline(url, message, context))
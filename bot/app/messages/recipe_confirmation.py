@@ -28,6 +28,8 @@ async def send_recipe_confirmation(
     recipe: str,
     ingredients: str | Iterable[str],
     video_file_id: str,
+    *,
+    video_hash: str = '',
 ) -> None:
     """
     Отправляет пользователю видео (по file_id) и сообщение с рецептом
@@ -42,6 +44,7 @@ async def send_recipe_confirmation(
             'title': title,
             'recipe': recipe,
             'video_file_id': video_file_id,
+            'video_hash': video_hash,
             'ingredients': list(ingredients) if not isinstance(
                 ingredients, str
             ) else ingredients,
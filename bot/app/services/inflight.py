@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import time
+from contextlib import suppress
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+from redis.asyncio import Redis
+
+from packages.common_settings.settings import settings
+from packages.metrics import metrics
+from packages.notifications.base import Notifier
+from packages.notifications.fanout import FanoutNotifier
+from packages.redis import ttl
+from packages.redis.keys import RedisKeys
+from packages.redis.utils import acquire_lock, extend_lock, release_lock
+
+logger = logging.getLogger(__name__)
+
+R = TypeVar('R')
+
+_WAIT_TEXT = '⏳ Это видео уже обрабатывается — показываю прогресс...'
+_REMOTE_POLL_SEC = 2.0
+
+
+@dataclass(slots=True)
+class _Flight(Generic[R]):
+    future: asyncio.Future[Optional[R]]
+    followers: list[Notifier] = field(default_factory=list)
+
+
+class InFlightRegistry(Generic[R]):
+    """
+    Single-flight: одна обработка на ключ (нормализованный URL).
+
+    - Внутри процесса повторный запрос подписывается на уже идущую
+      обработку: получает её прогресс (FanoutNotifier) и её результат.
+    - С PIPELINE_INFLIGHT_REDIS=true ключ дополнительно захватывается
+      локом в Redis; другой процесс ждёт, пока владелец не положит
+      результат (load_remote), а если владелец пропал — берёт работу себе.
+    """
+
+    def __init__(
+        self, *,
+        use_redis: bool = settings.pipeline.inflight_redis,
+        wait_timeout: float = settings.pipeline.inflight_wait_timeout,
+    ) -> None:
+        self.use_redis = use_redis
+        self.wait_timeout = wait_timeout
+        self._flights: dict[str, _Flight[R]] = {}
+
+    def is_running(self, key: str) -> bool:
+        return key in self._flights
+
+    async def run(
+        self,
+        key: str,
+        notifier: Notifier,
+        work: Callable[[Notifier], Awaitable[Optional[R]]],
+        *,
+        redis: Optional[Redis] = None,
+        load_remote: Optional[Callable[[], Awaitable[Optional[R]]]] = None,
+    ) -> Optional[R]:
+        """
+        Выполняет work(notifier) не более одного раза на ключ.
+        Ожидающие получают тот же результат (None — если обработка упала).
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            return await self._follow(flight, notifier)
+
+        if self.use_redis and redis is not None and load_remote is not None:
+            return await self._run_distributed(
+                key, notifier, work, redis, load_remote
+            )
+        return await self._lead(key, notifier, work)
+
+    # ---------- внутренние хелперы ----------
+
+    async def _follow(
+        self, flight: _Flight[R], notifier: Notifier
+    ) -> Optional[R]:
+        metrics.incr('pipeline.inflight.joined')
+        await notifier.info(_WAIT_TEXT)
+        flight.followers.append(notifier)
+        try:
+            return await asyncio.shield(flight.future)
+        finally:
+            with suppress(ValueError):
+                flight.followers.remove(notifier)
+
+    async def _lead(
+        self,
+        key: str,
+        notifier: Notifier,
+        work: Callable[[Notifier], Awaitable[Optional[R]]],
+    ) -> Optional[R]:
+        flight: _Flight[R] = _Flight(
+            asyncio.get_running_loop().create_future()
+        )
+        self._flights[key] = flight
+        result: Optional[R] = None
+        try:
+            result = await work(FanoutNotifier(notifier, flight.followers))
+            return result
+        finally:
+            # при ошибке ожидающие получат None и сообщат об этом сами
+            flight.future.set_result(result)
+            self._flights.pop(key, None)
+
+    async def _run_distributed(
+        self,
+        key: str,
+        notifier: Notifier,
+        work: Callable[[Notifier], Awaitable[Optional[R]]],
+        redis: Redis,
+        load_remote: Callable[[], Awaitable[Optional[R]]],
+    ) -> Optional[R]:
+        lock_key = RedisKeys.inflight_lock(
+            hashlib.sha1(key.encode('utf-8')).hexdigest()
+        )
+        token = await acquire_lock(redis, lock_key, ttl.INFLIGHT_LOCK)
+        if token is None:
+            metrics.incr('pipeline.inflight.joined_remote')
+            await notifier.info(_WAIT_TEXT)
+            deadline = time.monotonic() + self.wait_timeout
+            while token is None:
+                await asyncio.sleep(_REMOTE_POLL_SEC)
+                # пока ждали, тот же ключ мог начать обрабатывать и
+                # этот процесс — присоединяемся локально
+                flight = self._flights.get(key)
+                if flight is not None:
+                    return await self._follow(flight, notifier)
+                result = await load_remote()
+                if result is not None:
+                    return result
+                if time.monotonic() > deadline:
+                    logger.warning('Не дождались обработки %s', key)
+                    return None
+                if not await redis.exists(lock_key):
+                    # владелец закончил без результата или пропал —
+                    # пробуем взять работу на себя
+                    token = await acquire_lock(
+                        redis, lock_key, ttl.INFLIGHT_LOCK
+                    )
+
+        heartbeat = asyncio.create_task(
+            self._keep_lock(redis, lock_key, token)
+        )
+        try:
+            return await self._lead(key, notifier, work)
+        finally:
+            heartbeat.cancel()
+            with suppress(asyncio.CancelledError):
+                await heartbeat
+            with suppress(Exception):
+                await release_lock(redis, lock_key, token)
+
+    @staticmethod
+    async def _keep_lock(redis: Redis, lock_key: str, token: str) -> None:
+        while True:
+            await asyncio.sleep(ttl.INFLIGHT_LOCK / 3)
+            with suppress(Exception):
+                await extend_lock(redis, lock_key, token, ttl.INFLIGHT_LOCK)
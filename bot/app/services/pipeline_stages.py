@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional, ParamSpec, TypeVar
+
+from packages.common_settings.settings import settings
+from packages.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+P = ParamSpec('P')
+T = TypeVar('T')
+
+
+class PipelineStage:
+    """
+    Стадия конвейера со своим лимитом параллельности и ограниченной
+    очередью на вход. Это семафор вокруг вызова, а не отдельный
+    воркер: параллельность стадий появляется только от нескольких
+    одновременных задач (воркеры VideoJobQueue).
+
+    - concurrency — сколько задач выполняется в стадии одновременно;
+    - queue_size — сколько задач может ждать своей очереди сверх лимита.
+      Остальные ждут «на входе», не занимая место в очереди стадии,
+      что даёт обратное давление на предыдущие стадии.
+
+    Метрики (packages.metrics):
+      pipeline.<stage>.completed / .failed / .cancelled — счётчики,
+      pipeline.<stage>.latency / .wait — тайминги выполнения и ожидания,
+      pipeline.<stage>.running / .queued — текущие значения.
+    """
+
+    def __init__(self, name: str, concurrency: int, queue_size: int):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self._admission = asyncio.Semaphore(concurrency + queue_size)
+        self._slots = asyncio.Semaphore(concurrency)
+        self._queued = 0
+        self._running = 0
+
+    async def run(
+        self, fn: Callable[P, Awaitable[T]], *args: P.args, **kwargs: P.kwargs
+    ) -> T:
+        prefix = f'pipeline.{self.name}'
+        entered = time.monotonic()
+        async with self._admission:
+            self._queued += 1
+            metrics.gauge(f'{prefix}.queued', self._queued)
+            try:
+                await self._slots.acquire()
+            finally:
+                self._queued -= 1
+                metrics.gauge(f'{prefix}.queued', self._queued)
+            started = time.monotonic()
+            metrics.observe(f'{prefix}.wait', started - entered)
+            self._running += 1
+            metrics.gauge(f'{prefix}.running', self._running)
+            try:
+                result = await fn(*args, **kwargs)
+            except asyncio.CancelledError:
+                # отмена (соседняя стадия упала, остановка) — не сбой
+                metrics.incr(f'{prefix}.cancelled')
+                raise
+            except BaseException:
+                metrics.incr(f'{prefix}.failed')
+                raise
+            else:
+                metrics.incr(f'{prefix}.completed')
+                return result
+            finally:
+                self._running -= 1
+                metrics.gauge(f'{prefix}.running', self._running)
+                metrics.observe(
+                    f'{prefix}.latency', time.monotonic() - started
+                )
+                self._slots.release()
+
+
+@dataclass(slots=True)
+class PipelineStages:
+    """Набор стадий конвейера обработки видео."""
+    download: PipelineStage
+    convert: PipelineStage
+    upload: PipelineStage
+    audio: PipelineStage
+    transcribe: PipelineStage
+    llm: PipelineStage
+
+    @classmethod
+    def from_settings(cls) -> PipelineStages:
+        cfg = settings.pipeline
+        q = cfg.stage_queue_size
+        return cls(
+            download=PipelineStage('download', cfg.download_concurrency, q),
+            convert=PipelineStage('convert', cfg.convert_concurrency, q),
+            upload=PipelineStage('upload', cfg.upload_concurrency, q),
+            audio=PipelineStage('audio', cfg.audio_concurrency, q),
+            transcribe=PipelineStage(
+                'transcribe', cfg.transcribe_concurrency, q
+            ),
+            llm=PipelineStage('llm', cfg.llm_concurrency, q),
+        )
+
+
+_stages: Optional[PipelineStages] = None
+
+
+def get_pipeline_stages() -> PipelineStages:
+    global _stages
+    if _stages is None:
+        _stages = PipelineStages.from_settings()
+        logger.debug('Стадии конвейера созданы: %s', _stages)
+    return _stages
@@ -27,6 +27,7 @@ async def save_recipe_service(
     category_id: str,
     ingredients_raw: Iterable[object],
     video_url: str | None = None,
+    video_hash: str | None = None,
 ) -> Optional[int]:
     """
     Сохраняет рецепт:
@@ -59,7 +60,9 @@ async def save_recipe_service(
         )
 
         if video_url:
-            await VideoRepository.create(session, video_url, int(recipe.id))
+            await VideoRepository.create(
+                session, video_url, int(recipe.id), content_hash=video_hash
+            )
 
         await session.commit()
         return int(recipe.id)
@@ -0,0 +1,105 @@
+import logging
+import os
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from bot.app.core.types import PTBContext
+from bot.app.messages.telegram_media import send_video_to_channel
+from packages.db.database import Database
+from packages.db.repository import VideoFileRepository
+from packages.media.content_hash import async_file_sha256
+from packages.metrics import metrics
+from packages.redis.repository import VideoFileCacheRepository
+
+logger = logging.getLogger(__name__)
+
+
+class VideoFileService:
+    """
+    Индекс sha256 содержимого -> file_id в канале хранения: Redis как
+    горячий кэш, Postgres (video_files) как источник истины. Ошибки
+    индекса не мешают загрузке — просто отправим файл ещё раз.
+    """
+
+    def __init__(self, db: Database, redis: Optional[Redis]):
+        self.db = db
+        self.redis = redis
+
+    async def get_file_id(self, content_hash: str) -> Optional[str]:
+        # 1) Redis
+        if self.redis is not None:
+            try:
+                cached = await VideoFileCacheRepository.get(
+                    self.redis, content_hash
+                )
+                if cached:
+                    return cached
+            except Exception as e:
+                logger.warning('Кэш file_id недоступен: %s', e)
+
+        # 2) БД (и прогреваем Redis)
+        try:
+            async with self.db.session() as session:
+                file_id = await VideoFileRepository.get_file_id(
+                    session, content_hash
+                )
+        except Exception as e:
+            logger.warning('Индекс video_files недоступен: %s', e)
+            return None
+        if file_id:
+            await self._cache(content_hash, file_id)
+        return file_id
+
+    async def remember(
+        self, content_hash: str, file_id: str, size: int
+    ) -> None:
+        try:
+            async with self.db.session() as session:
+                await VideoFileRepository.upsert(
+                    session, content_hash, file_id, size
+                )
+                await session.commit()
+        except Exception as e:
+            logger.warning('Не удалось сохранить file_id в БД: %s', e)
+        await self._cache(content_hash, file_id)
+
+    async def _cache(self, content_hash: str, file_id: str) -> None:
+        if self.redis is None:
+            return
+        try:
+            await VideoFileCacheRepository.set(
+                self.redis, content_hash, file_id
+            )
+        except Exception as e:
+            logger.warning('Не удалось сохранить file_id в кэш: %s', e)
+
+
+async def upload_video_deduplicated(
+    context: PTBContext, video_path: str
+) -> tuple[str, str]:
+    """
+    Возвращает (file_id, sha256). Если такой же файл уже загружался
+    в канал хранения, берём его file_id и ничего не отправляем.
+    """
+    try:
+        content_hash = await async_file_sha256(video_path)
+        size = os.path.getsize(video_path)
+    except OSError as e:
+        logger.error('Видео не найдено: %s (%s)', video_path, e)
+        return '', ''
+
+    state = context.bot_data['state']
+    service = VideoFileService(state.db, state.redis)
+    file_id = await service.get_file_id(content_hash)
+    if file_id:
+        metrics.incr('upload.dedup.hit')
+        metrics.incr('upload.dedup.bytes_saved', size)
+        logger.debug('♻️ Видео уже в канале: %s', content_hash)
+        return file_id, content_hash
+
+    metrics.incr('upload.dedup.miss')
+    file_id = await send_video_to_channel(context, video_path)
+    if file_id:
+        await service.remember(content_hash, file_id, size)
+    return file_id, content_hash
@@ -1,114 +1,491 @@
 import asyncio
 import logging
-from typing import Optional
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Optional
 
+from redis.asyncio import Redis
 from telegram import Message
 
 from bot.app.core.types import PTBContext
 from bot.app.messages.recipe_confirmation import send_recipe_confirmation
-from bot.app.messages.telegram_media import send_video_to_channel
 from bot.app.notifications.telegram_notifier import TelegramNotifier
+from bot.app.services.inflight import InFlightRegistry
+from bot.app.services.pipeline_stages import get_pipeline_stages
+from bot.app.services.video_files import upload_video_deduplicated
 from bot.app.utils.deepseek_answers import extract_recipes
-from packages.media.audio_extractor import extract_audio
+from packages.common_settings.settings import settings
+from packages.media.audio_extractor import async_extract_pcm
+from packages.media.download_limiter import DownloadLimitTimeout
+from packages.media.media_processing import (
+    ProcessedMedia,
+    convert_and_extract_pcm,
+)
 from packages.media.safe_remove import safe_remove
+from packages.media.shared_file import SharedFile
 from packages.media.speech_recognition import async_transcribe_audio
-from packages.media.video_converter import async_convert_to_mp4
-from packages.media.video_downloader import async_download_video_and_description
-
-AUDIO_FOLDER = 'audio/'
+from packages.media.transcription import TranscriptionError
+from packages.media.video_converter import (
+    TRANSCODE,
+    ConversionPlan,
+    prepare_conversion,
+    run_conversion,
+)
+from packages.media.video_downloader import (
+    VideoInfo,
+    VideoTooLongError,
+    async_download_video_and_description,
+    canonical_source_url,
+    has_video_id,
+    probe_video_info,
+)
+from packages.media.workspace import JobDir, get_media_workspace
+from packages.metrics import metrics
+from packages.notifications.base import Notifier
+from packages.recipes_core.deepseek_parsers import (
+    INSTRUCTIONS,
+    TITLE,
+    RecipeExtraction,
+)
+from packages.recipes_core.description_classifier import score_description
+from packages.redis.repository import VideoSourceCacheRepository
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(slots=True)
+class VideoProcessingResult:
+    """Результат тяжёлых стадий — всё, что нужно для подтверждения."""
+    video_file_id: Optional[str]
+    description: str
+    transcript: str
+    recipe: RecipeExtraction
+    # sha256 загруженного mp4 (индекс video_files)
+    video_hash: str = ''
+    # распознавание упало или не уложилось в таймаут (пустой текст)
+    transcript_failed: bool = False
+
+    @property
+    def is_complete(self) -> bool:
+        return self.recipe.is_usable
+
+    @property
+    def is_cacheable(self) -> bool:
+        # неполный результат из-за сбоя Whisper не должен жить в кэше
+        return self.is_complete and not self.transcript_failed
+
+    def to_cache(self) -> dict[str, Any]:
+        return {
+            'file_id': self.video_file_id,
+            'content_hash': self.video_hash,
+            'description': self.description,
+            'transcript': self.transcript,
+            'recipe': self.recipe.model_dump(exclude={'raw'}),
+        }
+
+    @classmethod
+    def from_cache(cls, data: dict[str, Any]) -> 'VideoProcessingResult':
+        return cls(
+            video_file_id=data.get('file_id'),
+            description=data.get('description', ''),
+            transcript=data.get('transcript', ''),
+            recipe=RecipeExtraction(**data.get('recipe', {})),
+            video_hash=data.get('content_hash', ''),
+        )
+
+
+# Одна обработка на ролик: повторные ссылки ждут уже идущую
+_inflight: InFlightRegistry[VideoProcessingResult] = InFlightRegistry()
+
+
 async def process_video_pipeline(
-        url: str, message: Message, context: PTBContext
+        url: str, message: Message, context: PTBContext,
+        *, status_message_id: Optional[int] = None
 ) -> None:
     """ Основной конвейер обработки видео:
-    1) Скачиваем видео и описание
+    0) Ищем готовый результат по каноническому URL (кэш в Redis) или
+       присоединяемся к уже идущей обработке того же ролика (её прогресс
+       дублируется в наше статус-сообщение)
+    1) Берём метаданные без скачивания (длительность, подпись,
+       канонический URL) и скачиваем видео и описание
     2) Конвертируем в mp4
-    3) Загружаем в канал и получаем file_id
-    4) Извлекаем аудио
-    5) Распознаём текст
+    3) Загружаем в канал и получаем file_id (или берём file_id уже
+       загруженного файла с тем же sha256)
+    4) Извлекаем аудио и распознаём текст (пропускаем, если рецепт
+       целиком в описании): при перекодировании — тем же проходом
+       ffmpeg, что и конвертация, иначе из исходника параллельно
+       с шагами 2–3
+    5) Ждём текст
     6) Генерируем рецепт через AI
     7) Отправляем пользователю на подтверждение
     8) (в save_recipe_handler) сохраняем в БД, если подтвердил
     В случае ошибок — уведомляем пользователя.
-    9) Чистим временные файлы
+    9) Чистим временные файлы (каталог задачи в MediaWorkspace)
+    Каждый шаг выполняется в своей стадии (pipeline_stages) с отдельным
+    лимитом параллельности. Стадии — это семафоры, а не очереди между
+    стадиями: разные видео перекрываются (одно распознаётся, другое
+    скачивается) только когда в конвейере несколько видео сразу —
+    PIPELINE_WORKERS > 1 воркеров очереди.
+    status_message_id — сообщение «в очереди», которое продолжаем
+    редактировать вместо отправки нового.
     """
     chat_id = message.chat_id if hasattr(
         message, 'chat_id'
     ) else message.chat.id
 
     notifier = TelegramNotifier(context.bot, chat_id, context=context)
-    notifier.message_id = None
+    notifier.message_id = status_message_id
+
+    source_url = canonical_source_url(url)
+    redis: Optional[Redis] = context.bot_data['state'].redis
+
+    result = await _get_cached_result(redis, source_url)
+    info: Optional[VideoInfo] = None
+    if (
+        result is None and not _inflight.is_running(source_url)
+        and not has_video_id(url)
+    ):
+        # метаданные без скачивания: короткая ссылка резолвится в
+        # канонический URL, а слишком длинный ролик отсекается сразу.
+        # Ссылку с id ролика не пробуем — это лишний запрос к платформе
+        # под её лимитом; длительность проверит сам загрузчик
+        info = await probe_video_info(url)
+        if info is not None and info.canonical_url != source_url:
+            source_url = info.canonical_url
+            result = await _get_cached_result(redis, source_url)
+        if result is None and info is not None and _too_long(info):
+            metrics.incr('pipeline.probe.too_long')
+            await notifier.error(_too_long_text())
+            return
+
+    if result is not None:
+        metrics.incr('pipeline.source_cache.hit')
+        await notifier.info(
+            '♻️ Это видео уже обрабатывалось — беру готовый рецепт.'
+        )
+    else:
+        if not _inflight.is_running(source_url):
+            metrics.incr('pipeline.source_cache.miss')
+
+        async def _work(n: Notifier) -> Optional[VideoProcessingResult]:
+            res = await _run_stages(url, context, n, info)
+            # кладём в кэш до снятия лока — его ждут другие процессы
+            if res is not None and res.is_cacheable:
+                await _cache_result(redis, source_url, res)
+            return res
+
+        result = await _inflight.run(
+            source_url, notifier, _work,
+            redis=redis,
+            load_remote=partial(_get_cached_result, redis, source_url),
+        )
+
+    await _deliver_result(result, message, context, notifier)
+
+
+def _too_long(info: VideoInfo) -> bool:
+    limit = settings.pipeline.max_video_seconds
+    return bool(limit and info.duration and info.duration > limit)
+
+
+def _too_long_text() -> str:
+    return (
+        'Видео слишком длинное — пришлите ролик до '
+        f'{settings.pipeline.max_video_seconds // 60} минут.'
+    )
+
+
+def _caption_is_full(description: str) -> bool:
+    caption = score_description(description)
+    if caption.score < settings.pipeline.caption_skip_threshold:
+        return False
+    # рецепт целиком в подписи — самая дорогая стадия не нужна
+    metrics.incr('pipeline.caption_skip.hit')
+    logger.debug('Рецепт в описании (%s), без распознавания', caption)
+    return True
+
+
+async def _run_stages(
+    url: str, context: PTBContext, notifier: Notifier,
+    info: Optional[VideoInfo] = None,
+) -> Optional[VideoProcessingResult]:
+    """
+    Тяжёлая часть конвейера: скачивание, конвертация, распознавание.
+    Файлы задачи лежат в её каталоге рабочей папки и удаляются вместе
+    с ним, когда задача (и загрузка в канал) его отпустят.
+    """
+    job = get_media_workspace().new_job()
+    try:
+        return await _run_job_stages(job, url, context, notifier, info)
+    finally:
+        job.release()
+
+
+async def _run_job_stages(
+    job: JobDir, url: str, context: PTBContext, notifier: Notifier,
+    info: Optional[VideoInfo],
+) -> Optional[VideoProcessingResult]:
+    """
+    Стадии одной задачи. Если подпись из probe уже содержит полный
+    рецепт, LLM стартует параллельно со скачиванием.
+    """
     # стартовое сообщение (создастся и запомнится message_id)
     await notifier.info(
         '🔄 Скачиваю видео и описание... Пожалуйста, подождите.'
     )
 
-    # дальше обычный ход
-    video_path, description = await async_download_video_and_description(url)
+    stages = get_pipeline_stages()
+    started = time.monotonic()
+
+    llm_client = context.bot_data['state'].llm
+    early_llm: Optional[asyncio.Task[tuple[str, str, str]]] = None
+    if info is not None and _caption_is_full(info.description):
+        early_llm = asyncio.create_task(stages.llm.run(
+            extract_recipes, info.description, '', client=llm_client
+        ))
+
+    try:
+        video_path, description = await stages.download.run(
+            async_download_video_and_description, url, str(job.path)
+        )
+    except VideoTooLongError as e:
+        _cancel(early_llm)
+        metrics.incr('pipeline.download.too_long')
+        logger.info('Ролик слишком длинный: %s', e)
+        await notifier.error(_too_long_text())
+        return None
+    except DownloadLimitTimeout as e:
+        _cancel(early_llm)
+        logger.warning('Не дождались лимита загрузок: %s', e)
+        await notifier.error(
+            'Платформа сейчас перегружена, попробуйте позже.'
+        )
+        return None
+    except BaseException:
+        # сбой или отмена скачивания — ранний запрос к LLM не нужен
+        _cancel(early_llm)
+        raise
     await notifier.progress(20, '📼 Видео скачано')
     if not video_path:
+        _cancel(early_llm)
         await notifier.error(
             'Не удалось скачать видео. Отправьте ссылку ещё раз.'
         )
-        return
+        return None
 
-    convert_task = asyncio.create_task(async_convert_to_mp4(video_path))
-    await notifier.progress(40, 'Видео конвертировано')
+    async def _on_convert(done: float) -> None:
+        await notifier.progress(
+            20 + int(20 * done), '⚙️ Конвертирую видео...'
+        )
+
+    if early_llm is not None:
+        # рецепт уже извлекается из подписи, полученной при probe
+        description = info.description if info else description
+        need_audio = False
+    else:
+        need_audio = not _caption_is_full(description)
 
-    def _cleanup_src_video_after_convert(t: asyncio.Task) -> None:
-        safe_remove(video_path)
+    plan: Optional[ConversionPlan] = None
+    try:
+        plan = await prepare_conversion(video_path)
+    except BaseException:
+        _cancel(early_llm)
+        raise
+    # перекодирование и так декодирует весь источник — звук берём из
+    # того же прохода ffmpeg, а не декодируем исходник второй раз;
+    # для NOOP/REMUX звук извлекается параллельно с конвертацией
+    single_pass = (
+        need_audio and plan is not None and plan.kind == TRANSCODE
+    )
 
-    convert_task.add_done_callback(_cleanup_src_video_after_convert)
-    converted_path = await convert_task
+    # исходник читают две ветки: конвертация и (если нужно) звук;
+    # удалится, когда обе его отпустят
+    parallel_audio = need_audio and not single_pass
+    source = SharedFile(video_path, refs=2 if parallel_audio else 1)
+    transcript_task: Optional[asyncio.Task[str]] = None
+    if parallel_audio:
+        # Whisper не ждёт конвертации: звук берём из исходника, пока
+        # видео перекодируется и грузится в канал
+        transcript_task = asyncio.create_task(
+            _transcribe_source(source)
+        )
 
-    upload_task: asyncio.Task[Optional[str]] = asyncio.create_task(
-        send_video_to_channel(context, converted_path)
+    converted_path = ''
+    try:
+        # plan None — разрешение источника неизвестно, видео не
+        # подготовить (converted_path останется пустым)
+        if plan is not None and single_pass:
+            media = await stages.convert.run(
+                convert_and_extract_pcm, plan, on_progress=_on_convert
+            )
+            converted_path = media.video_path
+            transcript_task = asyncio.create_task(_transcribe_media(media))
+        elif plan is not None:
+            converted_path = await stages.convert.run(
+                run_conversion, plan, on_progress=_on_convert
+            )
+    except BaseException:
+        _cancel(early_llm, transcript_task)
+        raise
+    finally:
+        # файл, уже годный для Telegram, конвертер возвращает как есть —
+        # тогда ссылка остаётся до загрузки в канал
+        if converted_path != video_path:
+            source.release()
+    await notifier.progress(40, 'Видео конвертировано')
+
+    # одинаковый файл в канал второй раз не грузим (индекс по sha256)
+    upload_task: asyncio.Task[tuple[str, str]] = asyncio.create_task(
+        stages.upload.run(upload_video_deduplicated, context, converted_path)
     )
+    # файл нужен загрузке, даже если задача упадёт раньше неё
+    job.acquire()
+    upload_task.add_done_callback(lambda _: job.release())
 
     if context.user_data is not None:
         context.user_data['video_path'] = converted_path
         context.user_data['video_upload_task'] = upload_task
     await notifier.progress(60, '✅ Видео загружено. Распознаём текст...')
 
-    audio_path = extract_audio(converted_path, AUDIO_FOLDER)
-    transcribe_task = asyncio.create_task(async_transcribe_audio(audio_path))
-
-    def _cleanup_audio_after_done(_task: asyncio.Task) -> None:
-        safe_remove(audio_path)
-
-    transcribe_task.add_done_callback(_cleanup_audio_after_done)
-    transcript = await transcribe_task
+    transcript = ''
+    transcript_failed = False
+    if transcript_task is not None:
+        try:
+            transcript = await transcript_task
+        except TranscriptionError as e:
+            # рецепт соберём по описанию, но результат не кэшируем
+            logger.warning('Текст из видео не распознан: %s', e)
+            transcript_failed = True
 
     await notifier.progress(
         80, '🧠 Подготавливаем рецепт через AI... '
         'Рецепт практически готов!'
     )
 
-    title, recipe, ingredients = await extract_recipes(
-        description, transcript
-    )
+    async def _on_section(section: str, text: str) -> None:
+        # показываем название, не дожидаясь конца ответа LLM
+        if section == TITLE:
+            await notifier.progress(85, f'🍽 {text} — дописываю рецепт...')
+        elif section == INSTRUCTIONS:
+            await notifier.progress(92, '🍽 Шаги готовы, собираю список...')
+
+    if early_llm is not None:
+        title, recipe, ingredients = await early_llm
+    else:
+        title, recipe, ingredients = await stages.llm.run(
+            extract_recipes, description, transcript,
+            client=llm_client,
+            on_section=_on_section,
+        )
 
     video_file_id: Optional[str] = None
+    video_hash = ''
     try:
         # если аплоад уже успел — получим результат мгновенно
         # таймаут можно убрать, если не нужен контроль зависания
-        video_file_id = await upload_task
+        video_file_id, video_hash = await upload_task
     except Exception:
         # не валим весь процесс: просто не будет превью из канала
         # (при желании можно notifier.info(...) или notifier.error(...))
         video_file_id = None
 
-    if context.user_data is not None and video_file_id:
-        context.user_data['video_file_id'] = video_file_id
-        safe_remove(converted_path)
+    if video_file_id:
+        if converted_path == video_path:
+            source.release()
+        else:
+            safe_remove(converted_path)
 
-    if title and recipe:
-        await notifier.progress(100, 'Готово ✅')
-        await send_recipe_confirmation(
-            message, context, title, recipe, ingredients, video_file_id
-        )
-    else:
+    metrics.observe('pipeline.total.latency', time.monotonic() - started)
+    return VideoProcessingResult(
+        video_file_id=video_file_id,
+        video_hash=video_hash if video_file_id else '',
+        description=description,
+        transcript=transcript,
+        transcript_failed=transcript_failed,
+        recipe=RecipeExtraction(
+            title=title,
+            instructions_text=recipe,
+            ingredients_text=ingredients,
+        ),
+    )
+
+
+async def _transcribe_source(source: SharedFile) -> str:
+    """Звук из исходника -> текст; ссылка на исходник — до конца PCM."""
+    stages = get_pipeline_stages()
+    try:
+        # аудио не пишем на диск: PCM из ffmpeg сразу уходит в Whisper
+        audio = await stages.audio.run(async_extract_pcm, source.path)
+    finally:
+        source.release()
+    return await stages.transcribe.run(async_transcribe_audio, audio)
+
+
+async def _transcribe_media(media: ProcessedMedia) -> str:
+    """PCM из общего прохода ffmpeg -> текст."""
+    if media.audio is None:
+        raise TranscriptionError('ffmpeg не отдал аудиодорожку')
+    return await get_pipeline_stages().transcribe.run(
+        async_transcribe_audio, media.audio
+    )
+
+
+def _cancel(*tasks: Optional[asyncio.Task[Any]]) -> None:
+    for task in tasks:
+        if task is not None:
+            task.cancel()
+
+
+async def _deliver_result(
+    result: Optional[VideoProcessingResult],
+    message: Message,
+    context: PTBContext,
+    notifier: TelegramNotifier,
+) -> None:
+    """Отправляет пользователю рецепт на подтверждение или ошибку."""
+    if result is None or not result.is_complete:
+        metrics.incr('pipeline.total.failed')
         await notifier.error('Не удалось извлечь данные из видео.')
+        return
+
+    if context.user_data is not None and result.video_file_id:
+        context.user_data['video_file_id'] = result.video_file_id
+
+    metrics.incr('pipeline.total.completed')
+    await notifier.progress(100, 'Готово ✅')
+    await send_recipe_confirmation(
+        message, context,
+        result.recipe.title,
+        result.recipe.instructions_text,
+        result.recipe.ingredients_text,
+        result.video_file_id or '',
+        video_hash=result.video_hash,
+    )
+
+
+async def _get_cached_result(
+    redis: Optional[Redis], source_url: str
+) -> Optional[VideoProcessingResult]:
+    if redis is None:
+        return None
+    try:
+        data = await VideoSourceCacheRepository.get(redis, source_url)
+        return VideoProcessingResult.from_cache(data) if data else None
+    except Exception as e:
+        logger.warning('Кэш источника недоступен (%s): %s', source_url, e)
+        return None
+
+
+async def _cache_result(
+    redis: Optional[Redis], source_url: str, result: VideoProcessingResult
+) -> None:
+    # без file_id кэш бесполезен — видео всё равно придётся качать
+    if redis is None or not result.video_file_id:
+        return
+    try:
+        await VideoSourceCacheRepository.set(
+            redis, source_url, result.to_cache()
+        )
+    except Exception as e:
+        logger.warning('Не удалось сохранить кэш источника: %s', e)
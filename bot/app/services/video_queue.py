@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+import uuid
+from contextlib import suppress
+from typing import Any, Optional, cast
+
+from redis.asyncio import Redis
+from telegram import Message
+from telegram.ext import CallbackContext
+
+from bot.app.core.types import PTBApp, PTBContext
+from bot.app.notifications.telegram_notifier import TelegramNotifier
+from bot.app.services.video_pipeline import process_video_pipeline
+from packages.common_settings.settings import settings
+from packages.redis.repository import VideoJobQueueRepository
+
+logger = logging.getLogger(__name__)
+
+_REQUEUE_INTERVAL_SEC = 30.0
+
+
+class QueueFullError(Exception):
+    """У пользователя уже слишком много задач в очереди."""
+
+
+class VideoJobQueue:
+    """
+    Очередь обработки видео поверх Redis + пул воркеров.
+
+    - Хендлер только кладёт задачу в очередь (submit) и сразу отвечает.
+    - N воркеров (PIPELINE_WORKERS) забирают задачи round-robin по
+      пользователям и запускают process_video_pipeline.
+    - Задача хранится в Redis до ack, поэтому переживает рестарт бота:
+      истёкшая аренда возвращает её в очередь.
+    """
+
+    def __init__(
+        self, app: PTBApp, redis: Redis, *,
+        workers: int = settings.pipeline.workers,
+        lease_seconds: int = settings.pipeline.job_lease_seconds,
+        max_attempts: int = settings.pipeline.job_max_attempts,
+        max_queued_per_user: int = settings.pipeline.max_queued_per_user,
+        poll_interval: float = settings.pipeline.poll_interval,
+    ) -> None:
+        self.app = app
+        self.redis = redis
+        self.workers = workers
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.max_queued_per_user = max_queued_per_user
+        self.poll_interval = poll_interval
+
+        self._tasks: list[asyncio.Task[None]] = []
+        self._wakeup = asyncio.Event()
+        self._busy = 0
+
+    # ---------- жизненный цикл ----------
+
+    async def start(self) -> None:
+        """Возвращает «осиротевшие» задачи в очередь и запускает воркеров."""
+        requeued, dropped = await VideoJobQueueRepository.requeue_expired(
+            self.redis, self.max_attempts
+        )
+        if requeued or dropped:
+            logger.info(
+                '♻️ Восстановлено задач из очереди: %s, удалено: %s',
+                requeued, dropped
+            )
+        for n in range(self.workers):
+            self._tasks.append(
+                asyncio.create_task(self._worker(n), name=f'video-worker-{n}')
+            )
+        self._tasks.append(
+            asyncio.create_task(self._requeue_loop(), name='video-requeue')
+        )
+        logger.info('🚀 Запущено воркеров обработки видео: %s', self.workers)
+
+    async def stop(self) -> None:
+        """Останавливает воркеров; незавершённые задачи вернутся в очередь."""
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        self._tasks.clear()
+        logger.info('✅ Воркеры обработки видео остановлены.')
+
+    # ---------- публичный контракт ----------
+
+    async def submit(self, url: str, message: Message) -> int:
+        """
+        Кладёт ссылку в очередь. Возвращает число задач перед ней.
+        Бросает QueueFullError, если у пользователя слишком много задач.
+        """
+        user_id = (
+            message.from_user.id if message.from_user else message.chat_id
+        )
+        queued = await VideoJobQueueRepository.user_queue_length(
+            self.redis, user_id
+        )
+        if queued >= self.max_queued_per_user:
+            raise QueueFullError(user_id)
+
+        job_id = uuid.uuid4().hex
+        payload: dict[str, Any] = {
+            'id': job_id,
+            'url': url,
+            'user_id': user_id,
+            'chat_id': message.chat_id,
+            # сообщение целиком — чтобы после рестарта отвечать на него же
+            'message': message.to_dict(),
+            'status_message_id': None,
+            'enqueued_at': time.time(),
+        }
+        await VideoJobQueueRepository.enqueue(
+            self.redis, job_id, user_id, payload
+        )
+        ahead = await VideoJobQueueRepository.position(
+            self.redis, user_id, job_id
+        )
+        if ahead > 0 or self._busy >= self.workers:
+            status_id = await self._notify_queued(message, user_id, ahead)
+            if status_id is not None:
+                # пайплайн продолжит редактировать это же сообщение
+                payload['status_message_id'] = status_id
+                await VideoJobQueueRepository.update_job(
+                    self.redis, job_id, payload
+                )
+        self._wakeup.set()
+        return ahead
+
+    # ---------- внутренние хелперы ----------
+
+    async def _notify_queued(
+        self, message: Message, user_id: int, ahead: int
+    ) -> Optional[int]:
+        context = self._build_context(message.chat_id, user_id)
+        notifier = TelegramNotifier(
+            self.app.bot, message.chat_id, context=context
+        )
+        notifier.message_id = None
+        await notifier.info(
+            f'🕒 Ссылка принята и поставлена в очередь. '
+            f'Перед вами задач: {ahead}'
+        )
+        return notifier.message_id
+
+    def _build_context(self, chat_id: int, user_id: int) -> PTBContext:
+        return cast(
+            PTBContext,
+            CallbackContext(self.app, chat_id=chat_id, user_id=user_id),
+        )
+
+    async def _worker(self, n: int) -> None:
+        while True:
+            try:
+                job_id = await VideoJobQueueRepository.pop_next(
+                    self.redis, self.lease_seconds
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning('Воркер %s: ошибка чтения очереди: %s', n, e)
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            if job_id is None:
+                self._wakeup.clear()
+                with suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(
+                        self._wakeup.wait(), timeout=self.poll_interval
+                    )
+                continue
+
+            try:
+                await self._process(n, job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # сбой Redis в get_job/ack не должен убивать воркер:
+                # неподтверждённая задача вернётся по истечении аренды
+                logger.exception(
+                    'Воркер %s: ошибка при обработке задачи %s', n, job_id
+                )
+                await asyncio.sleep(self.poll_interval)
+
+    async def _process(self, n: int, job_id: str) -> None:
+        payload = await VideoJobQueueRepository.get_job(self.redis, job_id)
+        if payload is None:
+            await VideoJobQueueRepository.ack(self.redis, job_id)
+            return
+
+        self._busy += 1
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        started = time.monotonic()
+        logger.debug(
+            'Воркер %s взял задачу %s (ожидание %.1fs)', n, job_id,
+            time.time() - float(payload.get('enqueued_at', time.time()))
+        )
+        try:
+            await self._run_job(payload)
+        except asyncio.CancelledError:
+            # бот останавливается — задача вернётся в очередь
+            with suppress(Exception):
+                await VideoJobQueueRepository.release(self.redis, job_id)
+            raise
+        except Exception:
+            logger.exception('💥 Ошибка обработки задачи %s', job_id)
+            await VideoJobQueueRepository.ack(self.redis, job_id)
+        else:
+            await VideoJobQueueRepository.ack(self.redis, job_id)
+            logger.debug(
+                'Задача %s выполнена за %.1fs', job_id,
+                time.monotonic() - started
+            )
+        finally:
+            self._busy -= 1
+            heartbeat.cancel()
+            with suppress(asyncio.CancelledError):
+                await heartbeat
+
+    async def _run_job(self, payload: dict[str, Any]) -> None:
+        message = Message.de_json(payload['message'], self.app.bot)
+        if message is None:
+            logger.error('Битое сообщение в задаче %s', payload.get('id'))
+            return
+        context = self._build_context(
+            int(payload['chat_id']), int(payload['user_id'])
+        )
+        await process_video_pipeline(
+            payload['url'], message, context,
+            status_message_id=payload.get('status_message_id'),
+        )
+
+    async def _heartbeat(self, job_id: str) -> None:
+        interval = max(1.0, self.lease_seconds / 3)
+        while True:
+            await asyncio.sleep(interval)
+            with suppress(Exception):
+                await VideoJobQueueRepository.touch(
+                    self.redis, job_id, self.lease_seconds
+                )
+
+    async def _requeue_loop(self) -> None:
+        while True:
+            await asyncio.sleep(_REQUEUE_INTERVAL_SEC)
+            try:
+                requeued, _ = await VideoJobQueueRepository.requeue_expired(
+                    self.redis, self.max_attempts
+                )
+                if requeued:
+                    self._wakeup.set()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning('Не удалось вернуть задачи в очередь: %s', e)
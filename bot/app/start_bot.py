@@ -9,12 +9,21 @@ from telegram.ext import Application
 
 from bot.app.core.types import AppState, PTBApp
 from bot.app.handlers.setup import setup_handlers
+from bot.app.services.video_queue import VideoJobQueue
 from packages.common_settings.settings import settings
 from packages.db.database import Database
 from packages.db.migrate_and_seed import ensure_db_up_to_date
 from packages.db.models import Base
+from packages.integrations.deepseek_api import (
+    close_deepseek_client,
+    get_deepseek_client,
+)
 from packages.logging_config import setup_logging
-from packages.media.video_downloader import cleanup_old_videos
+from packages.media.speech_recognition import warmup_model
+from packages.media.transcription import close_transcription_engine
+from packages.media.video_downloader import shutdown_download_executor
+from packages.media.workspace import get_media_workspace
+from packages.recipes_core.services.llm_cache import CachedChatClient
 from packages.redis.redis_conn import close_redis, get_redis
 
 setup_logging()
@@ -47,9 +56,11 @@ async def runtime_start(ptb_app: PTBApp, state: AppState) -> None:
     pong = await state.redis.ping()
     logger.info('🧠 Redis подключён, PING=%s', pong)
 
-    # Фоновая очистка
+    # Фоновая уборка рабочей папки медиа (размер, возраст, место на диске)
     logger.info('🚀 Запускаем фоновую задачу очистки видео…')
-    state.cleanup_task = asyncio.create_task(cleanup_old_videos())
+    state.cleanup_task = asyncio.create_task(
+        get_media_workspace().run_sweeper()
+    )
 
     # БД: bootstrap (по флагу) и healthcheck
     if settings.db.bootstrap_schema:
@@ -65,6 +76,20 @@ async def runtime_start(ptb_app: PTBApp, state: AppState) -> None:
         await ensure_db_up_to_date(sync_db_url)
         logger.info('Миграция выполнена')
 
+    # LLM-клиент: один HTTP-пул с keep-alive на всё приложение,
+    # поверх — кэш ответов в Redis
+    state.llm = get_deepseek_client()
+    if settings.deepseek.cache_enabled:
+        state.llm = CachedChatClient(state.llm, state.redis)
+
+    # Модель Whisper грузим в фоне — бот отвечает на апдейты сразу
+    if settings.transcription.warmup_on_startup:
+        state.warmup_task = asyncio.create_task(warmup_model())
+
+    # Очередь обработки видео (задачи переживают рестарт — лежат в Redis)
+    state.video_queue = VideoJobQueue(ptb_app, state.redis)
+    await state.video_queue.start()
+
     # Если включён режим вебхука — ставим вебхук (вариант А: авто)
     if settings.telegram.use_webhook:
         await ptb_app.bot.set_webhook(
@@ -82,8 +107,18 @@ async def runtime_stop(state: AppState) -> None:
     Здесь можно останавливать долгоживущие задачи, отключаться от БД и т.п.
     """
     # Остановить фоновые задачи
-    # достаём контейнер и корректно гасим ресурсы
-    cur_state: AppState = state.bot_data['state']
+    cur_state: AppState = state
+
+    # Воркеры очереди: незавершённые задачи вернутся в очередь
+    if cur_state.video_queue is not None:
+        await cur_state.video_queue.stop()
+        cur_state.video_queue = None
+
+    warmup: Optional[asyncio.Task[None]] = cur_state.warmup_task
+    if warmup and not warmup.done():
+        warmup.cancel()
+        with suppress(asyncio.CancelledError):
+            await warmup
 
     task: Optional[asyncio.Task[None]] = cur_state.cleanup_task
     if task and not task.done():
@@ -93,6 +128,15 @@ async def runtime_stop(state: AppState) -> None:
             await task
         logger.info('✅ Фоновая задача остановлена.')
 
+    # Пулы распознавания речи и загрузок
+    close_transcription_engine()
+    shutdown_download_executor()
+
+    # HTTP-пул LLM-клиента
+    if cur_state.llm is not None:
+        await close_deepseek_client()
+        cur_state.llm = None
+
     # Закрыть Redis
     if cur_state.redis is not None:
         await close_redis()
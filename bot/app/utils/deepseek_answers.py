@@ -1,14 +1,25 @@
+from typing import Optional
+
+from packages.recipes_core.services.extract_recipe import (
+    AsyncChatClient,
+    SectionCallback,
+)
 from packages.recipes_core.services.provider import get_default_extractor
 
 
 async def extract_recipes(
-        description: str, transcript: str
+        description: str, transcript: str,
+        *, client: Optional[AsyncChatClient] = None,
+        on_section: Optional[SectionCallback] = None
 ) -> tuple[str, str, str]:
     """
     Извлекает название, текст рецепта и ингредиенты из описания и транскрипта.
+    client — общий LLM-клиент приложения (AppState.llm);
+    on_section — колбэк для разделов ответа по мере стриминга.
     """
-    extractor = get_default_extractor()
+    extractor = get_default_extractor(client)
     data = await extractor.extract(
-        description=description, recognized_text=transcript
+        description=description, recognized_text=transcript,
+        on_section=on_section,
     )
     return data.title, data.instructions_text, data.ingredients_text
@@ -19,6 +19,9 @@ class AppState:
     db: Database
     cleanup_task: Any | None = None  # сюда можно класть фоновые таски/хэндлы
     redis: Optional[Redis] = None
+    video_queue: Any | None = None  # очередь обработки видео (bot)
+    warmup_task: Any | None = None  # фоновая загрузка моделей (bot)
+    llm: Any | None = None  # общий асинхронный LLM-клиент (bot)
 
 
 __all__ = ['AppState']
@@ -308,6 +308,234 @@ class DeepSeekSettings(BaseAppSettings):
     api_key: SecretStr = Field(alias='DEEPSEEK_API_KEY')
     base_url: str = Field(alias='DEEPSEEK_BASE_URL')
     model: str = Field(alias='DEEPSEEK_MODEL')
+    # таймаут одного запроса (с) и на установку соединения
+    timeout: float = Field(default=60.0, gt=0, alias='DEEPSEEK_TIMEOUT')
+    connect_timeout: float = Field(
+        default=10.0, gt=0, alias='DEEPSEEK_CONNECT_TIMEOUT'
+    )
+    # повторы на 429/5xx/сетевые ошибки с экспоненциальной паузой
+    max_retries: int = Field(default=3, ge=0, alias='DEEPSEEK_MAX_RETRIES')
+    retry_base_delay: float = Field(
+        default=0.5, gt=0, alias='DEEPSEEK_RETRY_BASE_DELAY'
+    )
+    retry_max_delay: float = Field(
+        default=8.0, gt=0, alias='DEEPSEEK_RETRY_MAX_DELAY'
+    )
+    # пул keep-alive соединений общего HTTP-клиента
+    max_connections: int = Field(
+        default=20, ge=1, alias='DEEPSEEK_MAX_CONNECTIONS'
+    )
+    # бюджет токенов на описание + транскрипт в запросе к LLM
+    prompt_token_budget: int = Field(
+        default=3000, ge=200, alias='LLM_PROMPT_TOKEN_BUDGET'
+    )
+    # кэш ответов LLM в Redis (одинаковый запрос — ноль токенов)
+    cache_enabled: bool = Field(default=True, alias='LLM_CACHE')
+    cache_max_entries: int = Field(
+        default=10_000, ge=1, alias='LLM_CACHE_MAX_ENTRIES'
+    )
+
+
+class PipelineSettings(BaseAppSettings):
+    """
+    Конфигурация очереди обработки видео: число воркеров,
+    лимиты на пользователя и аренда (lease) задач в Redis.
+    """
+    # сколько видео одновременно находится «в конвейере»; реальную
+    # нагрузку ограничивают лимиты стадий ниже
+    workers: int = Field(default=4, ge=1, alias='PIPELINE_WORKERS')
+    # потоки под блокирующие yt-dlp/instaloader (отдельный пул)
+    download_threads: int = Field(
+        default=4, ge=1, alias='PIPELINE_DOWNLOAD_THREADS'
+    )
+    # потоков ffmpeg на одну задачу и сколько ffmpeg одновременно
+    # (0 — по числу ядер: cpu_count // PIPELINE_FFMPEG_THREADS)
+    ffmpeg_threads: int = Field(
+        default=2, ge=1, alias='PIPELINE_FFMPEG_THREADS'
+    )
+    ffmpeg_concurrency: int = Field(
+        default=0, ge=0, alias='PIPELINE_FFMPEG_CONCURRENCY'
+    )
+    # таймаут одного запуска ffmpeg (сек), по истечении процесс убивается
+    ffmpeg_timeout: float = Field(
+        default=10 * 60, gt=0, alias='PIPELINE_FFMPEG_TIMEOUT'
+    )
+    # лимиты параллельности по стадиям конвейера
+    download_concurrency: int = Field(
+        default=3, ge=1, alias='PIPELINE_DOWNLOAD_CONCURRENCY'
+    )
+    convert_concurrency: int = Field(
+        default=1, ge=1, alias='PIPELINE_CONVERT_CONCURRENCY'
+    )
+    upload_concurrency: int = Field(
+        default=2, ge=1, alias='PIPELINE_UPLOAD_CONCURRENCY'
+    )
+    audio_concurrency: int = Field(
+        default=2, ge=1, alias='PIPELINE_AUDIO_CONCURRENCY'
+    )
+    transcribe_concurrency: int = Field(
+        default=1, ge=1, alias='PIPELINE_TRANSCRIBE_CONCURRENCY'
+    )
+    llm_concurrency: int = Field(
+        default=4, ge=1, alias='PIPELINE_LLM_CONCURRENCY'
+    )
+    # сколько задач может ждать входа в стадию сверх её лимита
+    stage_queue_size: int = Field(
+        default=4, ge=0, alias='PIPELINE_STAGE_QUEUE_SIZE'
+    )
+    max_queued_per_user: int = Field(
+        default=5, ge=1, alias='PIPELINE_MAX_QUEUED_PER_USER'
+    )
+    # сколько секунд задача считается «занятой» воркером без heartbeat;
+    # после истечения задача возвращается в очередь (например, после
+    # падения/рестарта бота)
+    job_lease_seconds: int = Field(
+        default=60, ge=10, alias='PIPELINE_JOB_LEASE_SECONDS'
+    )
+    job_max_attempts: int = Field(
+        default=3, ge=1, alias='PIPELINE_JOB_MAX_ATTEMPTS'
+    )
+    poll_interval: float = Field(
+        default=1.0, gt=0, alias='PIPELINE_POLL_INTERVAL'
+    )
+    # дедупликация одновременных обработок одного ролика между процессами
+    # (локально внутри процесса она работает всегда)
+    inflight_redis: bool = Field(
+        default=False, alias='PIPELINE_INFLIGHT_REDIS'
+    )
+    inflight_wait_timeout: int = Field(
+        default=15 * 60, ge=1, alias='PIPELINE_INFLIGHT_WAIT_TIMEOUT'
+    )
+    # ролики длиннее не обрабатываем (по probe, до скачивания); 0 — без
+    # ограничения
+    max_video_seconds: int = Field(
+        default=20 * 60, ge=0, alias='PIPELINE_MAX_VIDEO_SECONDS'
+    )
+    # оценка описания (0..1), начиная с которой рецепт берём из подписи
+    # и не распознаём речь; >1 — всегда распознавать
+    caption_skip_threshold: float = Field(
+        default=0.8, ge=0, alias='PIPELINE_CAPTION_SKIP_THRESHOLD'
+    )
+
+
+class DownloadLimitSettings(BaseAppSettings):
+    """
+    Лимиты скачивания по платформам (общие для всех процессов бота,
+    хранятся в Redis): token bucket по запросам в минуту с запасом burst
+    и максимум одновременных загрузок.
+    """
+    instagram_per_minute: float = Field(
+        default=6, gt=0, alias='DOWNLOAD_INSTAGRAM_PER_MINUTE'
+    )
+    instagram_burst: int = Field(
+        default=3, ge=1, alias='DOWNLOAD_INSTAGRAM_BURST'
+    )
+    instagram_concurrency: int = Field(
+        default=2, ge=1, alias='DOWNLOAD_INSTAGRAM_CONCURRENCY'
+    )
+    tiktok_per_minute: float = Field(
+        default=20, gt=0, alias='DOWNLOAD_TIKTOK_PER_MINUTE'
+    )
+    tiktok_burst: int = Field(default=5, ge=1, alias='DOWNLOAD_TIKTOK_BURST')
+    tiktok_concurrency: int = Field(
+        default=4, ge=1, alias='DOWNLOAD_TIKTOK_CONCURRENCY'
+    )
+    youtube_per_minute: float = Field(
+        default=30, gt=0, alias='DOWNLOAD_YOUTUBE_PER_MINUTE'
+    )
+    youtube_burst: int = Field(
+        default=5, ge=1, alias='DOWNLOAD_YOUTUBE_BURST'
+    )
+    youtube_concurrency: int = Field(
+        default=4, ge=1, alias='DOWNLOAD_YOUTUBE_CONCURRENCY'
+    )
+    default_per_minute: float = Field(
+        default=30, gt=0, alias='DOWNLOAD_DEFAULT_PER_MINUTE'
+    )
+    default_burst: int = Field(
+        default=5, ge=1, alias='DOWNLOAD_DEFAULT_BURST'
+    )
+    default_concurrency: int = Field(
+        default=4, ge=1, alias='DOWNLOAD_DEFAULT_CONCURRENCY'
+    )
+    # сколько максимум ждать слота, прежде чем сдаться (сек)
+    max_wait: float = Field(default=10 * 60, gt=0, alias='DOWNLOAD_MAX_WAIT')
+    # ограничение скорости одной загрузки в yt-dlp (байт/с)
+    ratelimit_bytes: int = Field(
+        default=2_000_000, ge=0, alias='DOWNLOAD_RATELIMIT_BYTES'
+    )
+    # предпочтительная высота кадра: выше для распознавания рецепта не
+    # нужно, а конвертер всё равно уменьшает картинку
+    max_height: int = Field(default=720, ge=144, alias='DOWNLOAD_MAX_HEIGHT')
+
+    def for_platform(self, platform: str) -> tuple[float, int, int]:
+        """(запросов в минуту, burst, одновременных) для платформы."""
+        if platform not in ('instagram', 'tiktok', 'youtube'):
+            platform = 'default'
+        return (
+            getattr(self, f'{platform}_per_minute'),
+            getattr(self, f'{platform}_burst'),
+            getattr(self, f'{platform}_concurrency'),
+        )
+
+
+class MediaWorkspaceSettings(BaseAppSettings):
+    """
+    Рабочая папка для скачанных и сконвертированных файлов: у каждой
+    задачи свой подкаталог, фоновая уборка держит папку в пределах
+    размера и возраста и следит за свободным местом на диске.
+    """
+    root: str = Field(default='videos', alias='MEDIA_ROOT')
+    # дополнительные папки, которые тоже убираются по возрасту/размеру
+    extra_roots: str = Field(default='audio', alias='MEDIA_EXTRA_ROOTS')
+    max_mb: int = Field(default=2048, ge=1, alias='MEDIA_MAX_MB')
+    # файлы без активной задачи старше этого удаляются (сек)
+    max_age: int = Field(default=60 * 60, ge=60, alias='MEDIA_MAX_AGE')
+    # если на диске свободно меньше — убираем всё неактивное
+    min_free_mb: int = Field(default=1024, ge=0, alias='MEDIA_MIN_FREE_MB')
+    sweep_interval: int = Field(
+        default=5 * 60, ge=10, alias='MEDIA_SWEEP_INTERVAL'
+    )
+
+    @property
+    def extra_root_list(self) -> list[str]:
+        return [x.strip() for x in self.extra_roots.split(',') if x.strip()]
+
+
+class TranscriptionSettings(BaseAppSettings):
+    """
+    Конфигурация распознавания речи (Whisper).
+    """
+    # tiny | base | small | medium | large ...
+    model: str = Field(default='base', alias='WHISPER_MODEL')
+    # загрузить модель в фоне сразу после старта, а не на первом видео
+    warmup_on_startup: bool = Field(default=True, alias='WHISPER_WARMUP')
+    # процессы-воркеры распознавания (0 — в потоке внутри процесса бота);
+    # куски речи после VAD распознаются параллельно только при > 1
+    workers: int = Field(default=1, ge=0, alias='TRANSCRIBE_WORKERS')
+    # потоки torch на воркер (0 — поровну делим ядра между воркерами)
+    torch_threads: int = Field(
+        default=0, ge=0, alias='TRANSCRIBE_TORCH_THREADS'
+    )
+    # сколько задач может ждать свободного воркера
+    queue_size: int = Field(default=8, ge=0, alias='TRANSCRIBE_QUEUE_SIZE')
+    timeout: float = Field(default=15 * 60, gt=0, alias='TRANSCRIBE_TIMEOUT')
+    # кэш транскриптов по отпечатку аудио в Redis
+    cache_enabled: bool = Field(default=True, alias='TRANSCRIPT_CACHE')
+    # выкидывать тишину и резать речь на куски, распознаваемые параллельно
+    vad_enabled: bool = Field(default=True, alias='TRANSCRIBE_VAD')
+    # порог речи: дБ над шумовым полом записи
+    vad_margin_db: float = Field(
+        default=12.0, alias='TRANSCRIBE_VAD_MARGIN_DB'
+    )
+    # паузы короче этого не разрывают фрагмент речи
+    vad_min_silence_ms: int = Field(
+        default=600, ge=0, alias='TRANSCRIBE_VAD_MIN_SILENCE_MS'
+    )
+    # максимальная длина куска (окно Whisper — 30 с)
+    vad_max_chunk_seconds: float = Field(
+        default=30.0, gt=0, alias='TRANSCRIBE_VAD_MAX_CHUNK_SECONDS'
+    )
 
 
 class SentrySettings(BaseAppSettings):
@@ -416,6 +644,16 @@ class Settings(BaseAppSettings):
     db: DatabaseSettings = Field(default_factory=DatabaseSettings)
     telegram: TelegramSettings = Field(default_factory=TelegramSettings)
     deepseek: DeepSeekSettings = Field(default_factory=DeepSeekSettings)
+    pipeline: PipelineSettings = Field(default_factory=PipelineSettings)
+    transcription: TranscriptionSettings = Field(
+        default_factory=TranscriptionSettings
+    )
+    download_limits: DownloadLimitSettings = Field(
+        default_factory=DownloadLimitSettings
+    )
+    media: MediaWorkspaceSettings = Field(
+        default_factory=MediaWorkspaceSettings
+    )
     sentry: SentrySettings = Field(default_factory=SentrySettings)
     # 🔹 CORS: список доменов, которым можно слать запросы к API
     cors_origins_raw: str | None = Field(default=None, alias='CORS_ORIGINS')
@@ -1,10 +1,20 @@
 from .database import Database
-from .models import Category, Ingredient, Recipe, RecipeIngredient, User, Video
+from .models import (
+    Category,
+    Ingredient,
+    Recipe,
+    RecipeIngredient,
+    User,
+    Video,
+    VideoFile,
+)
 from .repository import (
     CategoryRepository,
+    IngredientRepository,
     RecipeIngredientRepository,
     RecipeRepository,
     UserRepository,
+    VideoFileRepository,
     VideoRepository,
 )
 
@@ -12,5 +22,5 @@ __all__ = [
     'Database', 'Recipe', 'User', 'Ingredient', 'RecipeIngredient',
     'Video', 'Category', 'UserRepository', 'RecipeRepository',
     'CategoryRepository', 'VideoRepository', 'IngredientRepository',
-    'RecipeIngredientRepository'
+    'RecipeIngredientRepository', 'VideoFile', 'VideoFileRepository',
 ]
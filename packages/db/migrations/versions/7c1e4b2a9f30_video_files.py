@@ -0,0 +1,40 @@
+"""video files index by content hash
+
+Revision ID: 7c1e4b2a9f30
+Revises: dc078ab58d48
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e4b2a9f30'
+down_revision: Union[str, Sequence[str], None] = 'dc078ab58d48'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('video_files',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=False),
+    sa.Column('file_id', sa.String(length=255), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_video_files_content_hash'), 'video_files', ['content_hash'], unique=True)
+    op.add_column('videos', sa.Column('content_hash', sa.String(length=64), nullable=True))
+    op.create_index(op.f('ix_videos_content_hash'), 'videos', ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_videos_content_hash'), table_name='videos')
+    op.drop_column('videos', 'content_hash')
+    op.drop_index(op.f('ix_video_files_content_hash'), table_name='video_files')
+    op.drop_table('video_files')
@@ -180,12 +180,33 @@ class Video(Base):
         index=True,
     )
     video_url: Mapped[str] = mapped_column(String(500), nullable=False)
+    # sha256 загруженного файла (см. VideoFile)
+    content_hash: Mapped[str | None] = mapped_column(
+        String(64), nullable=True, index=True
+    )
 
     recipe: Mapped['Recipe'] = relationship(
         back_populates='video', lazy='selectin'
     )
 
 
+class VideoFile(Base):
+    """Ролик в канале хранения: sha256 содержимого -> file_id Telegram."""
+    __tablename__ = 'video_files'
+
+    id: Mapped[int] = mapped_column(
+        Integer, primary_key=True, autoincrement=True
+    )
+    content_hash: Mapped[str] = mapped_column(
+        String(64), nullable=False, unique=True, index=True
+    )
+    file_id: Mapped[str] = mapped_column(String(255), nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), nullable=False
+    )
+
+
 class Category(Base):
     """Модель категории."""
     __tablename__ = 'categories'
@@ -4,7 +4,7 @@ from __future__ import annotations
 import logging
 from typing import Generic, Iterable, List, Optional, TypeVar
 
-from sqlalchemy import desc, func, select, update
+from sqlalchemy import delete, desc, func, select, update
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.engine import ScalarResult
 from sqlalchemy.exc import IntegrityError
@@ -19,6 +19,7 @@ from packages.db.models import (
     RecipeIngredient,
     User,
     Video,
+    VideoFile,
 )
 from packages.db.schemas import (
     CategoryCreate,
@@ -223,6 +224,36 @@ class RecipeRepository(BaseRepository[Recipe]):
             raise ValueError('Recipe not found')
         await session.delete(recipe)
 
+    @classmethod
+    async def get_chunk_after(
+        cls, session: AsyncSession, after_id: int, limit: int
+    ) -> List[Recipe]:
+        """
+        Пачка рецептов с id > after_id по возрастанию id (keyset-пагинация:
+        без OFFSET, стабильна при вставках). Ингредиенты подгружаются.
+        """
+        statement = (
+            select(Recipe)
+            .where(Recipe.id > after_id)
+            .order_by(Recipe.id)
+            .limit(limit)
+        )
+        result = await session.scalars(statement)
+        return list(result)
+
+    @classmethod
+    async def bulk_update_texts(
+        cls, session: AsyncSession, rows: Iterable[dict[str, object]]
+    ) -> None:
+        """
+        Массово обновляет title/description по id одним executemany.
+        rows: [{'id': ..., 'title': ..., 'description': ...}, ...]
+        """
+        values = list(rows)
+        if not values:
+            return
+        await session.execute(update(Recipe), values)
+
 
 class CategoryRepository(BaseRepository[Category]):
     model = Category
@@ -320,9 +351,13 @@ class VideoRepository(BaseRepository[Video]):
 
     @classmethod
     async def create(
-        cls, session: AsyncSession, video_url: str, recipe_id: int
+        cls, session: AsyncSession, video_url: str, recipe_id: int,
+        content_hash: Optional[str] = None,
     ) -> Video:
-        video = cls.model(video_url=video_url, recipe_id=recipe_id)
+        video = cls.model(
+            video_url=video_url, recipe_id=recipe_id,
+            content_hash=content_hash,
+        )
         session.add(video)
         try:
             await session.flush()  # получим PK / дефолты
@@ -333,6 +368,42 @@ class VideoRepository(BaseRepository[Video]):
         return video
 
 
+class VideoFileRepository(BaseRepository[VideoFile]):
+    model = VideoFile
+
+    @classmethod
+    async def get_file_id(
+        cls, session: AsyncSession, content_hash: str
+    ) -> Optional[str]:
+        statement = select(cls.model.file_id).where(
+            cls.model.content_hash == content_hash
+        )
+        result = await session.execute(statement)
+        return result.scalar_one_or_none()
+
+    @classmethod
+    async def upsert(
+        cls, session: AsyncSession, content_hash: str, file_id: str,
+        size: int,
+    ) -> None:
+        """
+        Запоминает file_id для хэша; при повторе — обновляет (старый
+        file_id мог стать недействительным). Коммит делает вызывающий.
+        """
+        stmt = pg_insert(VideoFile).values(
+            content_hash=content_hash, file_id=file_id, size=size
+        )
+        await session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[VideoFile.content_hash],
+                set_={
+                    'file_id': stmt.excluded.file_id,
+                    'size': stmt.excluded.size,
+                },
+            )
+        )
+
+
 class IngredientRepository(BaseRepository[Ingredient]):
     model = Ingredient
 
@@ -455,3 +526,28 @@ class RecipeIngredientRepository(BaseRepository[RecipeIngredient]):
             )
         )
         await session.execute(stmt)
+
+    @classmethod
+    async def bulk_replace(
+        cls,
+        session: AsyncSession,
+        links: dict[int, Iterable[int]],
+    ) -> None:
+        """
+        Заменяет ингредиенты у пачки рецептов: {recipe_id: [ingredient_id]}.
+        Старые связи удаляются одним DELETE, новые вставляются одним INSERT.
+        """
+        if not links:
+            return
+        await session.execute(
+            delete(RecipeIngredient).where(
+                RecipeIngredient.recipe_id.in_(list(links))
+            )
+        )
+        values = [
+            {'recipe_id': int(recipe_id), 'ingredient_id': int(i)}
+            for recipe_id, ids in links.items()
+            for i in {int(i) for i in ids if i}
+        ]
+        if values:
+            await session.execute(pg_insert(RecipeIngredient).values(values))
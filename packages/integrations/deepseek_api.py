@@ -1,11 +1,49 @@
 from __future__ import annotations
 
-from typing import Iterable
+import asyncio
+import logging
+import random
+from dataclasses import dataclass
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Optional,
+    Sequence,
+    TypeVar,
+    cast,
+)
 
-from openai import OpenAI
-from openai.types.chat import ChatCompletionMessageParam
+import httpx
+from openai import (
+    APIConnectionError,
+    APIStatusError,
+    APITimeoutError,
+    AsyncOpenAI,
+    AsyncStream,
+    OpenAI,
+)
+from openai.types.chat import (
+    ChatCompletion,
+    ChatCompletionChunk,
+    ChatCompletionMessageParam,
+)
+from openai.types.completion_usage import CompletionUsage
 
 from packages.common_settings import settings
+from packages.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# сообщения чата: [{'role': ..., 'content': ...}, ...]
+ChatMessages = Sequence[dict[str, str]]
+
+
+def _to_params(messages: ChatMessages) -> list[ChatCompletionMessageParam]:
+    # SDK типизирует сообщения TypedDict'ами по ролям; формат тот же
+    return cast(list[ChatCompletionMessageParam], list(messages))
 
 
 class DeepSeekClient:
@@ -14,23 +52,187 @@ class DeepSeekClient:
             self, api_key: str | None = None,
             base_url: str | None = None, model: str | None = None
     ):
-        self.model = settings.deepseek.model
+        self.model = model or settings.deepseek.model
         self.client = OpenAI(
-            api_key=settings.deepseek.api_key.get_secret_value(),
-            base_url=settings.deepseek.base_url
+            api_key=api_key or settings.deepseek.api_key.get_secret_value(),
+            base_url=base_url or settings.deepseek.base_url
         )
 
     def chat(
-            self, messages: Iterable[ChatCompletionMessageParam], *,
+            self, messages: ChatMessages, *,
             temperature: float = 0.2, timeout: float | None = 30.0
     ) -> str:
         """Возвращает content первой choice как сырой текст."""
-        # timeout прокидывается через transport опционально;
-        # для простоты rely on SDK defaults
         responce = self.client.chat.completions.create(
             model=self.model,
-            messages=list(messages),
+            messages=_to_params(messages),
             temperature=temperature,
             stream=False,
+            timeout=timeout,
+        )
+        return (responce.choices[0].message.content or '').strip()
+
+
+@dataclass(slots=True)
+class ChatUsage:
+    """Расход токенов на запрос (заполняется клиентом, если передан)."""
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def update(self, usage: Optional[CompletionUsage]) -> None:
+        if usage is None:
+            return
+        self.prompt_tokens = usage.prompt_tokens
+        self.completion_tokens = usage.completion_tokens
+        metrics.incr('llm.tokens.prompt', usage.prompt_tokens)
+        metrics.incr('llm.tokens.completion', usage.completion_tokens)
+
+
+class AsyncDeepSeekClient:
+    """
+    Асинхронный клиент DeepSeek: один AsyncOpenAI на всё приложение
+    поверх httpx с keep-alive пулом — без нового соединения (и TLS)
+    на каждый рецепт и без потоков executor.
+
+    - timeout действительно ограничивает запрос (по умолчанию —
+      DEEPSEEK_TIMEOUT);
+    - на 429/5xx и сетевые ошибки — до DEEPSEEK_MAX_RETRIES повторов
+      с экспоненциальной паузой и полным джиттером.
+    """
+
+    def __init__(
+            self, api_key: str | None = None,
+            base_url: str | None = None, model: str | None = None
+    ):
+        cfg = settings.deepseek
+        self.model = model or cfg.model
+        self.timeout = cfg.timeout
+        self.max_retries = cfg.max_retries
+        self._http = httpx.AsyncClient(
+            timeout=httpx.Timeout(cfg.timeout, connect=cfg.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=cfg.max_connections,
+                max_keepalive_connections=cfg.max_connections,
+            ),
+        )
+        self.client = AsyncOpenAI(
+            api_key=api_key or cfg.api_key.get_secret_value(),
+            base_url=base_url or cfg.base_url,
+            http_client=self._http,
+            # повторы делаем сами — с джиттером и метриками
+            max_retries=0,
         )
+
+    async def chat(
+            self, messages: ChatMessages, *,
+            temperature: float = 0.2, timeout: float | None = None,
+            usage: Optional[ChatUsage] = None
+    ) -> str:
+        """Возвращает content первой choice как сырой текст."""
+        params = _to_params(messages)
+
+        async def _request() -> ChatCompletion:
+            with metrics.timer('llm.request'):
+                return await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=params,
+                    temperature=temperature,
+                    stream=False,
+                    timeout=timeout or self.timeout,
+                )
+
+        responce = await self._with_retries(_request)
+        (usage or ChatUsage()).update(responce.usage)
         return (responce.choices[0].message.content or '').strip()
+
+    async def chat_stream(
+            self, messages: ChatMessages, *,
+            temperature: float = 0.2, timeout: float | None = None,
+            usage: Optional[ChatUsage] = None
+    ) -> AsyncIterator[str]:
+        """
+        Отдаёт content по кускам (stream=True). Повторы — только до
+        первого куска: оборванный посреди ответ не переигрываем.
+        """
+        params = _to_params(messages)
+
+        async def _open() -> AsyncStream[ChatCompletionChunk]:
+            return await self.client.chat.completions.create(
+                model=self.model,
+                messages=params,
+                temperature=temperature,
+                stream=True,
+                # последний чанк придёт с расходом токенов
+                stream_options={'include_usage': True},
+                timeout=timeout or self.timeout,
+            )
+
+        stream = await self._with_retries(_open)
+        try:
+            async for chunk in stream:
+                if chunk.usage is not None:
+                    (usage or ChatUsage()).update(chunk.usage)
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        finally:
+            await stream.close()
+
+    async def _with_retries(self, call: Callable[[], Awaitable[T]]) -> T:
+        attempt = 0
+        while True:
+            try:
+                return await call()
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    metrics.incr('llm.failed')
+                    raise
+                delay = _backoff(attempt)
+                attempt += 1
+                metrics.incr('llm.retry')
+                logger.warning(
+                    'LLM: %s, повтор %s/%s через %.1fs',
+                    type(e).__name__, attempt, self.max_retries, delay
+                )
+                await asyncio.sleep(delay)
+
+    async def aclose(self) -> None:
+        await self.client.close()
+
+
+def _is_retryable(exc: BaseException) -> bool:
+    if isinstance(exc, (APITimeoutError, APIConnectionError)):
+        return True
+    if isinstance(exc, APIStatusError):
+        return exc.status_code == 429 or exc.status_code >= 500
+    return False
+
+
+def _backoff(attempt: int) -> float:
+    """Экспоненциальная пауза с полным джиттером (AWS full jitter)."""
+    cfg = settings.deepseek
+    cap = min(cfg.retry_max_delay, cfg.retry_base_delay * 2 ** attempt)
+    return random.uniform(0, cap)
+
+
+_client: Optional[AsyncDeepSeekClient] = None
+
+
+def get_deepseek_client() -> AsyncDeepSeekClient:
+    global _client
+    if _client is None:
+        _client = AsyncDeepSeekClient()
+    return _client
+
+
+async def close_deepseek_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
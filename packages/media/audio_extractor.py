@@ -1,27 +1,42 @@
 import logging
-import os
-import subprocess
+
+import numpy as np
+
+from packages.media.ffmpeg_runner import run_ffmpeg
 
 logger = logging.getLogger(__name__)
 
+# Формат, который ждёт Whisper: моно, 16 кГц
+SAMPLE_RATE = 16000
+# опции выхода: без видео, моно 16 кГц s16le
+PCM_ARGS = [
+    '-vn', '-c:a', 'pcm_s16le', '-ar', str(SAMPLE_RATE), '-ac', '1',
+]
 
-def extract_audio(video_path: str, output_folder: str) -> str:
-    """Извлекает аудио из видео и сохраняет как WAV."""
-    # Проверяем, существует ли директория для выходного файла
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
 
-    audio_path: str = os.path.join(
-        output_folder,
-        os.path.basename(video_path).rsplit('.', 1)[0] + '.wav'
+async def async_extract_pcm(video_path: str) -> np.ndarray:
+    """
+    Извлекает аудиодорожку сразу в память: ffmpeg пишет сырой s16le
+    в stdout, мы переводим его в float32 [-1, 1] — в таком виде массив
+    принимает whisper.transcribe. Без временного WAV и без блокировки
+    event loop.
+    """
+    logger.debug(f'Извлечение PCM из {video_path}')
+    stdout = await run_ffmpeg(
+        ['-i', video_path],
+        [[*PCM_ARGS, '-f', 's16le', 'pipe:1']],
+        name='audio', threads=1, capture_stdout=True,
     )
+    audio = pcm_to_float(stdout)
+    logger.debug(
+        f'PCM извлечён: {len(audio) / SAMPLE_RATE:.1f}s '
+        f'({len(stdout)} байт)'
+    )
+    return audio
+
 
-    command: list[str] = [
-        'ffmpeg', '-i', video_path,
-        '-vn', '-acodec', 'pcm_s16le', '-ar', '16000', '-ac', '1',
-        audio_path
-    ]
-    logger.debug(f'Извлечение аудио из {video_path} в {audio_path}')
-    subprocess.run(command, check=True)
-    logger.debug(f'Аудио успешно извлечено в {audio_path}')
-    return audio_path
+def pcm_to_float(raw: bytes) -> np.ndarray:
+    """s16le → float32 в диапазоне [-1, 1]."""
+    audio = np.frombuffer(raw, dtype=np.int16).astype(np.float32)
+    audio /= 32768.0
+    return audio
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+
+_CHUNK = 1024 * 1024
+
+
+def file_sha256(path: str) -> str:
+    """sha256 содержимого файла (читаем кусками по 1 МБ)."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+async def async_file_sha256(path: str) -> str:
+    # hashlib отпускает GIL на больших буферах — поток не мешает loop'у
+    return await asyncio.to_thread(file_sha256, path)
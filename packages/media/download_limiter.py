@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+import uuid
+from contextlib import asynccontextmanager, suppress
+from typing import AsyncIterator
+
+from redis.asyncio import Redis
+
+from packages.common_settings.settings import settings
+from packages.metrics import metrics
+from packages.redis import ttl
+from packages.redis.redis_conn import get_redis
+from packages.redis.repository import DownloadLimiterRepository
+
+logger = logging.getLogger(__name__)
+
+# как часто переспрашивать свободный слот (плюс джиттер)
+_SLOT_POLL_SEC = 1.0
+
+
+class DownloadLimitTimeout(Exception):
+    """Не дождались слота/токена на скачивание за DOWNLOAD_MAX_WAIT."""
+
+
+@asynccontextmanager
+async def platform_slot(platform: str) -> AsyncIterator[None]:
+    """
+    Ждёт разрешения на скачивание с платформы: сначала слот
+    одновременных загрузок, затем токен из bucket'а по частоте.
+    Лимиты общие для всех процессов бота (Redis). Пока загрузка идёт,
+    аренда слота продлевается.
+
+    Если Redis недоступен (в том числе посреди ожидания) — пропускаем
+    без ограничений (лучше скачать, чем упасть), и пишем предупреждение.
+    """
+    per_minute, burst, concurrency = (
+        settings.download_limits.for_platform(platform)
+    )
+    token = uuid.uuid4().hex
+    started = time.monotonic()
+    deadline = started + settings.download_limits.max_wait
+
+    try:
+        redis = await get_redis()
+        await _wait_slot(redis, platform, token, concurrency, deadline)
+    except DownloadLimitTimeout:
+        metrics.incr(f'download.{platform}.limit_timeout')
+        raise
+    except Exception as e:
+        logger.warning('Лимитер загрузок недоступен (%s): %s', platform, e)
+        yield
+        return
+
+    heartbeat = asyncio.create_task(
+        _keep_slot(redis, platform, token, concurrency)
+    )
+    try:
+        await _wait_token(redis, platform, per_minute, burst, deadline)
+        waited = time.monotonic() - started
+        metrics.observe(f'download.{platform}.limit_wait', waited)
+        if waited > 1:
+            logger.debug('Ждали слот %s: %.1fs', platform, waited)
+        yield
+    finally:
+        heartbeat.cancel()
+        with suppress(asyncio.CancelledError):
+            await heartbeat
+        with suppress(Exception):
+            await DownloadLimiterRepository.release_slot(
+                redis, platform, token
+            )
+
+
+async def _wait_slot(
+    redis: Redis, platform: str, token: str, limit: int, deadline: float
+) -> None:
+    while not await DownloadLimiterRepository.acquire_slot(
+        redis, platform, token, limit
+    ):
+        if time.monotonic() > deadline:
+            raise DownloadLimitTimeout(platform)
+        await asyncio.sleep(_SLOT_POLL_SEC * random.uniform(0.5, 1.5))
+
+
+async def _wait_token(
+    redis: Redis, platform: str, per_minute: float, burst: int,
+    deadline: float
+) -> None:
+    while True:
+        try:
+            wait = await DownloadLimiterRepository.take_token(
+                redis, platform, per_minute, burst
+            )
+        except Exception as e:
+            # как и для слота: без Redis не ограничиваем частоту
+            logger.warning(
+                'Лимитер загрузок недоступен (%s): %s', platform, e
+            )
+            return
+        if wait <= 0:
+            return
+        if time.monotonic() + wait > deadline:
+            raise DownloadLimitTimeout(platform)
+        # джиттер — чтобы ждущие процессы не пришли все разом
+        await asyncio.sleep(wait * random.uniform(1.0, 1.2))
+
+
+async def _keep_slot(
+    redis: Redis, platform: str, token: str, limit: int
+) -> None:
+    while True:
+        await asyncio.sleep(ttl.DOWNLOAD_SLOT / 3)
+        with suppress(Exception):
+            await DownloadLimiterRepository.acquire_slot(
+                redis, platform, token, limit
+            )
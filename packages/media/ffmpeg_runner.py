@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, Sequence
+
+from packages.common_settings.settings import settings
+from packages.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# доля выполненного (0..1) — например, для прогресса в статус-сообщении
+ProgressCallback = Callable[[float], Awaitable[None]]
+
+# не чаще раза в столько секунд зовём ProgressCallback
+_PROGRESS_INTERVAL = 2.0
+# сколько последних строк stderr держать для текста ошибки
+_STDERR_TAIL = 20
+# ключи, которые ffmpeg пишет в -progress
+_PROGRESS_KEYS = frozenset({
+    'frame', 'fps', 'bitrate', 'total_size', 'out_time_us', 'out_time_ms',
+    'out_time', 'dup_frames', 'drop_frames', 'speed', 'progress',
+})
+
+
+class FFmpegError(RuntimeError):
+    """ffmpeg завершился с ошибкой или не уложился в таймаут."""
+
+
+_semaphore: asyncio.Semaphore | None = None
+
+
+def ffmpeg_threads() -> int:
+    """Потоков ffmpeg на одну задачу (-threads)."""
+    return settings.pipeline.ffmpeg_threads
+
+
+def ffmpeg_slots() -> int:
+    """
+    Сколько ffmpeg одновременно: PIPELINE_FFMPEG_CONCURRENCY или
+    столько, чтобы задачи вместе занимали все ядра, но не больше.
+    """
+    configured = settings.pipeline.ffmpeg_concurrency
+    if configured:
+        return configured
+    return max(1, (os.cpu_count() or 1) // ffmpeg_threads())
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(ffmpeg_slots())
+    return _semaphore
+
+
+def _with_threads(output: Sequence[str], threads: int) -> list[str]:
+    """Вставляет -threads перед путём выхода, если его не задали явно."""
+    if '-threads' in output:
+        return list(output)
+    return [*output[:-1], '-threads', str(threads), output[-1]]
+
+
+def build_command(
+    inputs: Sequence[str],
+    outputs: Sequence[Sequence[str]],
+    *,
+    threads: int,
+    progress: bool,
+) -> list[str]:
+    """
+    inputs — опции и -i источников; outputs — опции каждого выхода,
+    последний элемент — путь (или pipe:1).
+    """
+    command = [
+        'ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error', '-y',
+    ]
+    if progress:
+        command += ['-progress', 'pipe:2', '-nostats']
+    command += inputs
+    for output in outputs:
+        command += _with_threads(output, threads)
+    return command
+
+
+async def run_ffmpeg(
+    inputs: Sequence[str],
+    outputs: Sequence[Sequence[str]],
+    *,
+    name: str = 'ffmpeg',
+    duration: Optional[float] = None,
+    on_progress: Optional[ProgressCallback] = None,
+    capture_stdout: bool = False,
+    timeout: Optional[float] = None,
+    threads: Optional[int] = None,
+) -> bytes:
+    """
+    Запускает ffmpeg без блокировки event loop'а и под общим семафором
+    (ffmpeg_slots). Таймаут и отмена задачи убивают процесс.
+
+    duration — длительность источника: по ней -progress переводится
+    в долю выполненного для on_progress. capture_stdout — вернуть то,
+    что ffmpeg пишет в pipe:1 (например, сырой PCM).
+    """
+    timeout = timeout or settings.pipeline.ffmpeg_timeout
+    command = build_command(
+        inputs, outputs,
+        threads=threads or ffmpeg_threads(),
+        progress=on_progress is not None and bool(duration),
+    )
+
+    async with _get_semaphore():
+        started = time.monotonic()
+        logger.debug('▶️ %s: %s', name, ' '.join(command))
+        proc = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=(
+                asyncio.subprocess.PIPE if capture_stdout
+                else asyncio.subprocess.DEVNULL
+            ),
+            stderr=asyncio.subprocess.PIPE,
+        )
+        tail: deque[str] = deque(maxlen=_STDERR_TAIL)
+        try:
+            stdout, _ = await asyncio.wait_for(
+                asyncio.gather(
+                    _read_stdout(proc),
+                    _read_stderr(proc, tail, duration, on_progress),
+                ),
+                timeout,
+            )
+            await proc.wait()
+        except asyncio.TimeoutError:
+            await _kill(proc)
+            metrics.incr(f'ffmpeg.{name}.timeout')
+            raise FFmpegError(f'{name}: таймаут {timeout:.0f}s')
+        except BaseException:
+            # отмена задачи (или ошибка колбэка) — процесс не оставляем
+            await _kill(proc)
+            raise
+        metrics.observe(f'ffmpeg.{name}', time.monotonic() - started)
+
+    if proc.returncode != 0:
+        raise FFmpegError(
+            f'{name}: ffmpeg завершился с кодом {proc.returncode}: '
+            + '\n'.join(tail)
+        )
+    return stdout
+
+
+async def _read_stdout(proc: asyncio.subprocess.Process) -> bytes:
+    if proc.stdout is None:
+        return b''
+    return await proc.stdout.read()
+
+
+async def _read_stderr(
+    proc: asyncio.subprocess.Process,
+    tail: deque[str],
+    duration: Optional[float],
+    on_progress: Optional[ProgressCallback],
+) -> None:
+    """Разбирает -progress (key=value) и копит хвост ошибок."""
+    assert proc.stderr is not None
+    last_report = 0.0
+    async for raw in proc.stderr:
+        line = raw.decode(errors='ignore').strip()
+        key, sep, value = line.partition('=')
+        if not sep or key not in _PROGRESS_KEYS:
+            if line:
+                tail.append(line)
+            continue
+        if key != 'out_time_us' or not duration or on_progress is None:
+            continue
+        try:
+            done = min(1.0, int(value) / 1_000_000 / duration)
+        except ValueError:
+            # N/A в начале кодирования
+            continue
+        now = time.monotonic()
+        if now - last_report >= _PROGRESS_INTERVAL:
+            last_report = now
+            await on_progress(done)
+
+
+async def _kill(proc: asyncio.subprocess.Process) -> None:
+    if proc.returncode is None:
+        proc.kill()
+        await proc.wait()
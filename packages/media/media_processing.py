@@ -0,0 +1,73 @@
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+from packages.media.audio_extractor import (
+    PCM_ARGS,
+    SAMPLE_RATE,
+    async_extract_pcm,
+    pcm_to_float,
+)
+from packages.media.ffmpeg_runner import (
+    FFmpegError,
+    ProgressCallback,
+    run_ffmpeg,
+)
+from packages.media.video_converter import NOOP, ConversionPlan
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class ProcessedMedia:
+    """mp4 для Telegram ('' — не получилось) и PCM для Whisper."""
+    video_path: str
+    audio: Optional[np.ndarray]
+
+
+async def convert_and_extract_pcm(
+    plan: ConversionPlan, *, on_progress: Optional[ProgressCallback] = None
+) -> ProcessedMedia:
+    """
+    Один проход ffmpeg вместо двух: источник декодируется один раз,
+    а граф пишет сразу два выхода — mp4 по плану конвертации и моно
+    16 кГц s16le в pipe:1. Окупается при TRANSCODE (источник и так
+    декодируется целиком); для NOOP запускается только извлечение звука.
+    """
+    if plan.kind == NOOP:
+        return ProcessedMedia(
+            plan.input_path, await _pcm_or_none(plan.input_path)
+        )
+
+    try:
+        stdout = await run_ffmpeg(
+            ['-i', plan.input_path],
+            [
+                [*plan.output_args, plan.output_path],
+                [*PCM_ARGS, '-f', 's16le', 'pipe:1'],
+            ],
+            name=plan.kind,
+            duration=plan.duration,
+            on_progress=on_progress,
+            capture_stdout=True,
+        )
+    except FFmpegError as e:
+        logger.error(f'Ошибка при конвертации видео: {e}')
+        return ProcessedMedia('', None)
+
+    audio = pcm_to_float(stdout)
+    logger.debug(
+        f'Конвертация завершена: {plan.output_path}, PCM '
+        f'{len(audio) / SAMPLE_RATE:.1f}s'
+    )
+    return ProcessedMedia(plan.output_path, audio)
+
+
+async def _pcm_or_none(path: str) -> Optional[np.ndarray]:
+    try:
+        return await async_extract_pcm(path)
+    except FFmpegError as e:
+        logger.error(f'Не удалось извлечь звук: {e}')
+        return None
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import logging
+
+from packages.media.safe_remove import safe_remove
+
+logger = logging.getLogger(__name__)
+
+
+class SharedFile:
+    """
+    Временный файл, который читают несколько веток конвейера
+    (например, конвертация и извлечение звука из одного источника).
+    Каждая ветка держит ссылку; файл удаляется, когда отпущена последняя.
+    Все вызовы — из event loop'а, поэтому без блокировок.
+    """
+
+    def __init__(self, path: str, refs: int = 1) -> None:
+        self.path = path
+        self._refs = refs
+
+    @property
+    def refs(self) -> int:
+        return self._refs
+
+    def acquire(self) -> None:
+        if self._refs <= 0:
+            raise RuntimeError(f'Файл уже удалён: {self.path}')
+        self._refs += 1
+
+    def release(self) -> None:
+        if self._refs <= 0:
+            logger.warning('Лишний release для %s', self.path)
+            return
+        self._refs -= 1
+        if self._refs == 0:
+            safe_remove(self.path)
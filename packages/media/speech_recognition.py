@@ -1,27 +1,216 @@
+from __future__ import annotations
+
 import asyncio
+import hashlib
 import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+from redis.asyncio import Redis
 
-import whisper
+from packages.common_settings.settings import settings
+from packages.media.audio_extractor import SAMPLE_RATE
+from packages.media.transcription import (
+    AudioInput,
+    TranscriptionError,
+    get_transcription_engine,
+)
+from packages.media.vad import split_speech
+from packages.metrics import metrics
+from packages.redis.redis_conn import get_redis
+from packages.redis.repository import TranscriptCacheRepository
 
-# Загружаем модель Whisper (можно выбрать другую, например, 'medium', 'large')
-model = whisper.load_model('base')
+if TYPE_CHECKING:
+    import whisper
 
 logger = logging.getLogger(__name__)
 
+# каждый какой отсчёт попадает в отпечаток аудио
+_FINGERPRINT_STEP = 4
+
+# Модели Whisper по имени. Загружаются лениво: импорт whisper тянет torch,
+# а load_model — секунды, поэтому ни то, ни другое не делаем при импорте.
+_models: dict[str, whisper.Whisper] = {}
+_models_lock = threading.Lock()
+
+
+def get_model(name: Optional[str] = None) -> whisper.Whisper:
+    """
+    Возвращает модель Whisper, загружая её при первом обращении.
+    Потокобезопасно: параллельные вызовы загрузят модель один раз.
+    """
+    name = name or settings.transcription.model
+    model = _models.get(name)
+    if model is not None:
+        return model
+    with _models_lock:
+        model = _models.get(name)
+        if model is None:
+            import whisper
+
+            started = time.monotonic()
+            model = whisper.load_model(name)
+            elapsed = time.monotonic() - started
+            metrics.observe('whisper.model_load', elapsed)
+            logger.info(
+                '🎙 Модель Whisper %s загружена за %.2fs', name, elapsed
+            )
+            _models[name] = model
+    return model
+
+
+async def warmup_model() -> None:
+    """
+    Фоновая загрузка модели после старта бота: поднимает воркеры
+    распознавания (каждый загружает свою копию модели).
+    """
+    try:
+        await get_transcription_engine().warmup()
+    except Exception as e:
+        logger.error(f'Не удалось загрузить модель Whisper: {e}')
 
-def transcribe_audio(audio_path: str) -> str:
-    """Распознаёт речь из аудиофайла."""
-    logger.debug(f'Начинаем транскрибацию аудио: {audio_path}')
+
+def transcribe_audio(audio: AudioInput) -> str:
+    """
+    Распознаёт речь из аудиофайла или PCM-массива. Ошибка Whisper —
+    TranscriptionError, а не пустая строка: пустой текст означает
+    «речи нет», и его можно кэшировать.
+    """
+    logger.debug(f'Начинаем транскрибацию аудио: {_describe(audio)}')
 
     try:
-        result = model.transcribe(audio_path)
-        # Логируем первые 100 символов текста
-        logger.debug(f'Распознанный текст: {result["text"][:100]}...')
-        return str(result['text'])
+        result = get_model().transcribe(audio)
     except Exception as e:
         logger.error(f'Ошибка при транскрибации: {e}')
+        raise TranscriptionError(str(e)) from e
+    # Логируем первые 100 символов текста
+    logger.debug(f'Распознанный текст: {result["text"][:100]}...')
+    return str(result['text'])
+
+
+async def async_transcribe_audio(audio: AudioInput) -> str:
+    """
+    Распознавание в пуле процессов (см. TranscriptionEngine).
+
+    Для PCM-массива сначала ищем готовый транскрипт по отпечатку аудио
+    (TranscriptCacheRepository): репост того же ролика по другой ссылке
+    Whisper не проходит вовсе.
+
+    Сбой (в том числе хотя бы одного куска после VAD) — исключение
+    TranscriptionError: частичный текст не возвращается и не кэшируется.
+    """
+    if isinstance(audio, str):
+        return await get_transcription_engine().transcribe(audio)
+
+    cfg = settings.transcription
+    redis: Optional[Redis] = None
+    fingerprint = ''
+    if cfg.cache_enabled:
+        redis = await get_redis()
+        fingerprint = audio_fingerprint(audio)
+        cached = await _get_cached_transcript(redis, fingerprint)
+        if cached is not None:
+            metrics.incr('transcribe.cache.hit')
+            metrics.incr('transcribe.cache.bytes_saved', audio.nbytes)
+            metrics.incr(
+                'transcribe.cache.seconds_saved', len(audio) / SAMPLE_RATE
+            )
+            logger.debug(f'♻️ Транскрипт из кэша: {fingerprint}')
+            return cached
+        metrics.incr('transcribe.cache.miss')
+
+    transcript = await _transcribe_pcm(audio)
+
+    if redis is not None and transcript:
+        await _cache_transcript(redis, fingerprint, transcript)
+    return transcript
+
+
+async def _transcribe_pcm(audio: np.ndarray) -> str:
+    """
+    PCM-массив прогоняется через VAD: тишина выбрасывается, речь
+    режется на куски до 30 с, которые распознаются параллельно на всех
+    воркерах, а текст склеивается в исходном порядке. Параллельно —
+    только при TRANSCRIBE_WORKERS > 1: с одним воркером (по умолчанию)
+    куски идут друг за другом, выигрыш — лишь в выброшенной тишине.
+    """
+    engine = get_transcription_engine()
+    cfg = settings.transcription
+    if not cfg.vad_enabled:
+        return await engine.transcribe(audio)
+
+    chunks = await asyncio.to_thread(
+        split_speech, audio,
+        margin_db=cfg.vad_margin_db,
+        min_silence_ms=cfg.vad_min_silence_ms,
+        max_chunk_seconds=cfg.vad_max_chunk_seconds,
+    )
+    # доля речи = speech_seconds / audio_seconds
+    metrics.incr('transcribe.vad.audio_seconds', len(audio) / SAMPLE_RATE)
+    metrics.incr(
+        'transcribe.vad.speech_seconds',
+        sum(len(c) for c in chunks) / SAMPLE_RATE
+    )
+    metrics.incr('transcribe.vad.chunks', len(chunks))
+    if not chunks:
+        logger.info('🤫 Речь в аудио не найдена')
         return ''
 
+    results = await asyncio.gather(
+        *(engine.transcribe(c) for c in chunks), return_exceptions=True
+    )
+    failed = [r for r in results if isinstance(r, BaseException)]
+    if failed:
+        # без куска текст неполон — как результат его не отдаём
+        metrics.incr('transcribe.vad.chunk_failed', len(failed))
+        raise TranscriptionError(
+            f'не распознано кусков: {len(failed)} из {len(chunks)}'
+        ) from failed[0]
+    texts = [r for r in results if isinstance(r, str)]
+    return ' '.join(t.strip() for t in texts if t.strip())
+
+
+def audio_fingerprint(audio: np.ndarray) -> str:
+    """
+    Быстрый отпечаток PCM: хэш по прореженным и огрублённым до 8 бит
+    отсчётам плюс длительность. Одинаковый звук из разных контейнеров
+    (перезалив, зеркало) даёт одинаковый отпечаток; переэнкод с потерями
+    может его изменить — тогда просто промах кэша.
+    """
+    decimated = audio[::_FINGERPRINT_STEP]
+    coarse = np.clip(decimated * 127.0, -127, 127).astype(np.int8)
+    h = hashlib.blake2b(digest_size=16)
+    h.update(len(audio).to_bytes(8, 'little'))
+    h.update(coarse.tobytes())
+    return h.hexdigest()
+
+
+async def _get_cached_transcript(
+    redis: Redis, fingerprint: str
+) -> Optional[str]:
+    try:
+        return await TranscriptCacheRepository.get(
+            redis, settings.transcription.model, fingerprint
+        )
+    except Exception as e:
+        logger.warning(f'Кэш транскриптов недоступен: {e}')
+        return None
+
+
+async def _cache_transcript(
+    redis: Redis, fingerprint: str, transcript: str
+) -> None:
+    try:
+        await TranscriptCacheRepository.set(
+            redis, settings.transcription.model, fingerprint, transcript
+        )
+    except Exception as e:
+        logger.warning(f'Не удалось сохранить транскрипт в кэш: {e}')
+
 
-async def async_transcribe_audio(audio_path: str) -> str:
-    return await asyncio.to_thread(transcribe_audio, audio_path)
+def _describe(audio: AudioInput) -> str:
+    if isinstance(audio, str):
+        return audio
+    return f'PCM {len(audio) / SAMPLE_RATE:.1f}s'
@@ -0,0 +1,232 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import TYPE_CHECKING, Optional, Union
+
+from packages.common_settings.settings import settings
+from packages.metrics import metrics
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Путь к файлу или готовый PCM (float32, моно, 16 кГц)
+AudioInput = Union[str, 'np.ndarray']
+
+
+class TranscriptionError(RuntimeError):
+    """Распознавание не удалось: ошибка Whisper, воркера или таймаут."""
+
+
+# ---------- код, выполняемый в процессах-воркерах ----------
+
+def _init_worker(model_name: str, torch_threads: int) -> None:
+    """Инициализация воркера: потоки torch и загрузка модели (один раз)."""
+    # до импорта torch — иначе OpenMP уже возьмёт все ядра
+    os.environ['OMP_NUM_THREADS'] = str(torch_threads)
+    os.environ['MKL_NUM_THREADS'] = str(torch_threads)
+    import torch
+
+    torch.set_num_threads(torch_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        # пул interop уже инициализирован — не критично
+        pass
+
+    from packages.media.speech_recognition import get_model
+
+    get_model(model_name)
+
+
+def _transcribe_in_worker(audio: AudioInput) -> str:
+    from packages.media.speech_recognition import transcribe_audio
+
+    return transcribe_audio(audio)
+
+
+def _ping_worker() -> int:
+    return os.getpid()
+
+
+# ---------- движок в процессе бота ----------
+
+class TranscriptionEngine:
+    """
+    Распознавание речи в отдельных процессах (spawn).
+
+    - Каждый воркер один раз загружает модель Whisper и работает с явно
+      заданным числом потоков torch — тяжёлая транскрибация не делит GIL
+      с event loop бота.
+    - Очередь на вход ограничена (workers + queue_size): лишние вызовы
+      ждут на await, а не копятся в executor.
+    - Отмена вызова снимает задачу, если она ещё не начала выполняться;
+      уже запущенная дорабатывает в воркере, результат отбрасывается.
+    - Таймаут уже запущенной задачи пересоздаёт пул: зависший воркер
+      иначе не освободить. Чтобы не уронить чужие вызовы, пул
+      пересоздаётся, когда в нём не осталось других задач; до тех пор
+      работает без одного воркера.
+    - workers=0 — режим без процессов (поток в процессе бота), удобен
+      локально и в тестах; поток по таймауту не прервать, он
+      дорабатывает, а результат отбрасывается.
+    """
+
+    def __init__(
+        self, *,
+        workers: int = settings.transcription.workers,
+        torch_threads: int = settings.transcription.torch_threads,
+        queue_size: int = settings.transcription.queue_size,
+        model_name: str = settings.transcription.model,
+        timeout: float = settings.transcription.timeout,
+    ) -> None:
+        self.workers = workers
+        self.torch_threads = torch_threads or max(
+            1, (os.cpu_count() or 1) // max(1, workers)
+        )
+        self.model_name = model_name
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max(1, workers) + queue_size)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # вызовы, ждущие результата пула, и отложенное пересоздание
+        self._inflight = 0
+        self._recycle_pending = False
+
+    def start(self) -> None:
+        if self.workers == 0 or self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(self.model_name, self.torch_threads),
+        )
+        logger.info(
+            '🎙 Пул распознавания: воркеров=%s, потоков torch=%s, модель=%s',
+            self.workers, self.torch_threads, self.model_name
+        )
+
+    async def warmup(self) -> None:
+        """Поднимает все процессы заранее (каждый загрузит модель)."""
+        if self.workers == 0:
+            from packages.media.speech_recognition import get_model
+
+            await asyncio.to_thread(get_model, self.model_name)
+            return
+        self.start()
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        pids = await asyncio.gather(*(
+            loop.run_in_executor(self._executor, _ping_worker)
+            for _ in range(self.workers)
+        ))
+        # модель грузится в воркерах, их метрики до /stats не доходят:
+        # меряем подъём пула отсюда
+        elapsed = time.monotonic() - started
+        metrics.observe('whisper.model_load', elapsed)
+        logger.info(
+            '🎙 Воркеры распознавания готовы за %.2fs: %s',
+            elapsed, sorted(set(pids))
+        )
+
+    async def transcribe(
+        self, audio: AudioInput, *, timeout: Optional[float] = None
+    ) -> str:
+        """
+        Распознаёт речь; таймаут, ошибка Whisper или смерть воркера —
+        TranscriptionError.
+        """
+        entered = time.monotonic()
+        async with self._slots:
+            metrics.observe('transcribe.wait', time.monotonic() - entered)
+            self._inflight += 1
+            try:
+                return await self._run(audio, timeout or self.timeout)
+            finally:
+                self._inflight -= 1
+                if self._recycle_pending and self._inflight == 0:
+                    self._recycle()
+
+    async def _run(self, audio: AudioInput, timeout: float) -> str:
+        job: Optional[Future[str]] = None
+        if self.workers == 0:
+            from packages.media.speech_recognition import transcribe_audio
+
+            fut: asyncio.Future[str] = asyncio.ensure_future(
+                asyncio.to_thread(transcribe_audio, audio)
+            )
+        else:
+            self.start()
+            assert self._executor is not None
+            job = self._executor.submit(_transcribe_in_worker, audio)
+            fut = asyncio.wrap_future(job)
+        try:
+            with metrics.timer('transcribe.run'):
+                return await asyncio.wait_for(fut, timeout)
+        except asyncio.TimeoutError as e:
+            metrics.incr('transcribe.timeout')
+            logger.error('Транскрибация не уложилась в таймаут')
+            if job is not None and not job.cancel():
+                # задача уже в воркере — освободить его можно только
+                # вместе с пулом; пересоздадим, когда уйдут чужие задачи
+                self._recycle_pending = True
+            raise TranscriptionError('таймаут распознавания') from e
+        except BrokenProcessPool as e:
+            # воркер умер (OOM и т.п.) — пул пересоздастся при
+            # следующем вызове
+            metrics.incr('transcribe.failed')
+            logger.error(f'Пул распознавания сломан: {e}')
+            self.shutdown()
+            raise TranscriptionError(str(e)) from e
+        except TranscriptionError:
+            metrics.incr('transcribe.failed')
+            raise
+        except Exception as e:
+            metrics.incr('transcribe.failed')
+            logger.error(f'Ошибка воркера транскрибации: {e}')
+            raise TranscriptionError(str(e)) from e
+
+    def _recycle(self) -> None:
+        """
+        Убивает процессы пула: задачу в воркере не отменить иначе.
+        Следующий вызов поднимет новый пул (модель загрузится заново).
+        """
+        self._recycle_pending = False
+        executor, self._executor = self._executor, None
+        if executor is None:
+            return
+        metrics.incr('transcribe.pool_recycled')
+        logger.warning('♻️ Пул распознавания пересоздаётся после таймаута')
+        for proc in list((executor._processes or {}).values()):
+            proc.terminate()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            logger.info('🔒 Пул распознавания остановлен.')
+
+
+_engine: Optional[TranscriptionEngine] = None
+
+
+def get_transcription_engine() -> TranscriptionEngine:
+    global _engine
+    if _engine is None:
+        _engine = TranscriptionEngine()
+        _engine.start()
+    return _engine
+
+
+def close_transcription_engine() -> None:
+    global _engine
+    if _engine is not None:
+        _engine.shutdown()
+        _engine = None
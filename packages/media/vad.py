@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import logging
+from typing import Any
+
+import numpy as np
+
+from packages.media.audio_extractor import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+_FRAME_MS = 30
+# запас вокруг речи, чтобы не обрезать первый/последний слог
+_PAD_MS = 200
+# всплески короче этого считаем щелчками, а не речью
+_MIN_SPEECH_MS = 250
+# абсолютный порог тишины (дБ относительно полной шкалы)
+_SILENCE_FLOOR_DB = -50.0
+
+
+def _frame_energy_db(audio: np.ndarray, frame: int) -> np.ndarray:
+    """RMS-энергия по кадрам в дБ (векторно, без циклов по кадрам)."""
+    n = len(audio) // frame
+    frames = audio[:n * frame].reshape(n, frame)
+    rms = np.sqrt(np.mean(np.square(frames), axis=1))
+    db: np.ndarray = 20.0 * np.log10(np.maximum(rms, 1e-10))
+    return db
+
+
+def _runs(mask: np.ndarray) -> np.ndarray:
+    """Отрезки подряд идущих True: массив [[start, end), ...] в кадрах."""
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(np.diff(padded.astype(np.int8)))
+    return edges.reshape(-1, 2)
+
+
+def speech_segments(
+    audio: np.ndarray,
+    *,
+    sample_rate: int = SAMPLE_RATE,
+    margin_db: float = 12.0,
+    min_silence_ms: int = 600,
+    max_chunk_seconds: float = 30.0,
+) -> list[tuple[int, int]]:
+    """
+    Находит фрагменты речи по энергии сигнала.
+
+    Порог — шумовой пол записи (10-й перцентиль энергии кадров) плюс
+    margin_db, но не выше 90-го перцентиля минус margin_db (иначе в
+    записи без пауз отрежется тихая речь) и не ниже абсолютной тишины.
+    Короткие паузы внутри речи склеиваются, короткие всплески
+    отбрасываются, длинные фрагменты режутся по самому тихому кадру,
+    чтобы кусок влез в окно Whisper.
+    Громкую музыку энергетический VAD от речи не отличает — она остаётся.
+
+    Возвращает границы в отсчётах: [(start, end), ...].
+    """
+    frame = sample_rate * _FRAME_MS // 1000
+    if len(audio) < frame:
+        return []
+
+    energy = _frame_energy_db(audio, frame)
+    noise, loud = np.percentile(energy, [10, 90])
+    threshold = max(
+        min(noise + margin_db, loud - margin_db), _SILENCE_FLOOR_DB
+    )
+    speech = energy > threshold
+
+    # заполняем короткие паузы между фрагментами речи
+    gaps = _runs(~speech)
+    short = (gaps[:, 1] - gaps[:, 0]) * _FRAME_MS < min_silence_ms
+    inner = (gaps[:, 0] > 0) & (gaps[:, 1] < len(speech))
+    for start, end in gaps[short & inner]:
+        speech[start:end] = True
+
+    runs = _runs(speech)
+    runs = runs[(runs[:, 1] - runs[:, 0]) * _FRAME_MS >= _MIN_SPEECH_MS]
+
+    pad = _PAD_MS // _FRAME_MS
+    max_frames = max(1, int(max_chunk_seconds * 1000) // _FRAME_MS)
+    segments: list[tuple[int, int]] = []
+    for start, end in runs:
+        start = max(0, start - pad)
+        end = min(len(speech), end + pad)
+        while end - start > max_frames:
+            # режем во второй половине окна, в самом тихом месте
+            lo = start + max_frames // 2
+            cut = lo + int(np.argmin(energy[lo:start + max_frames]))
+            segments.append((start, cut))
+            start = cut
+        segments.append((start, end))
+
+    # паддинг мог свести соседние фрагменты вместе
+    merged: list[tuple[int, int]] = []
+    for start, end in segments:
+        if merged and start <= merged[-1][1]:
+            prev_start, prev_end = merged[-1]
+            if end - prev_start <= max_frames:
+                merged[-1] = (prev_start, end)
+                continue
+            # не дублируем перекрытие — иначе слова повторятся в тексте
+            start = prev_end
+        merged.append((start, end))
+
+    return [
+        (int(s) * frame, min(len(audio), int(e) * frame)) for s, e in merged
+    ]
+
+
+def split_speech(audio: np.ndarray, **kwargs: Any) -> list[np.ndarray]:
+    """Куски аудио с речью по порядку; тишина выброшена."""
+    segments = speech_segments(audio, **kwargs)
+    kept = sum(e - s for s, e in segments)
+    logger.debug(
+        'VAD: %d фрагм., речь %.1fs из %.1fs',
+        len(segments), kept / SAMPLE_RATE, len(audio) / SAMPLE_RATE
+    )
+    return [audio[s:e] for s, e in segments]
@@ -1,86 +1,202 @@
 import asyncio
 import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Optional
 
 import ffmpeg
 
+from packages.media.ffmpeg_runner import (
+    FFmpegError,
+    ProgressCallback,
+    run_ffmpeg,
+)
+from packages.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
 
 CORRECTION_FACTOR = 0.6  # Уменьшение разрешения на 40%
 
+# Без перекодирования отправляем файлы, которые Telegram проигрывает
+# как есть (H.264 + AAC) и которые заметно меньше лимита Bot API в 50 МБ
+PASSTHROUGH_MAX_BYTES = 20 * 1024 * 1024
+PASSTHROUGH_MAX_SHORT_SIDE = 720
 
-def convert_to_mp4(input_path: str) -> str:
-    """Конвертирует видео в MP4 (H.264) с уменьшением качества на 40%."""
-    output_path = input_path.rsplit('.', 1)[0] + '_converted.mp4'
+NOOP = 'noop'
+REMUX = 'remux'
+TRANSCODE = 'transcode'
 
-    # Получаем исходное разрешение видео
-    width, height = _get_video_resolution(input_path)
 
-    logger.debug(f'Начинаем конвертацию видео: {input_path}')
-    if width is None or height is None:
-        logging.error('Не удалось получить разрешение видео')
-        return None
+@dataclass(slots=True)
+class MediaProbe:
+    """То, что нужно знать о файле, чтобы решить, как его готовить."""
+    container: str
+    video_codec: Optional[str]
+    audio_codec: Optional[str]
+    width: int
+    height: int
+    duration: float
+    bitrate: int
+    size: int
 
-    # Корректируем разрешение, если необходимо
-    corrected_width, corrected_height = _correct_resolution(width, height)
 
-    # Логирование размеров для проверки
-    logger.debug(
-        f'Исходное разрешение видео: {width}x{height}'
+def probe_media(path: str) -> Optional[MediaProbe]:
+    """ffprobe: контейнер, кодеки, разрешение, длительность, битрейт."""
+    try:
+        data: dict[str, Any] = ffmpeg.probe(path, v='error')
+    except ffmpeg.Error as e:
+        logger.error(f'Ошибка при анализе видео: {e}', exc_info=True)
+        return None
+
+    fmt = data.get('format', {})
+    streams: list[dict[str, Any]] = data.get('streams', [])
+    video: dict[str, Any] = next(
+        (s for s in streams if s.get('codec_type') == 'video'), {}
     )
-    logger.debug(
-        f'Исправленное разрешение видео: {corrected_width}x{corrected_height}'
+    audio: dict[str, Any] = next(
+        (s for s in streams if s.get('codec_type') == 'audio'), {}
+    )
+    return MediaProbe(
+        container=fmt.get('format_name', ''),
+        video_codec=video.get('codec_name'),
+        audio_codec=audio.get('codec_name'),
+        width=int(video.get('width') or 0),
+        height=int(video.get('height') or 0),
+        duration=float(fmt.get('duration') or 0),
+        bitrate=int(fmt.get('bit_rate') or 0),
+        size=int(fmt.get('size') or os.path.getsize(path)),
     )
 
-    # Уменьшаем разрешение на 40%
-    new_width = int(corrected_width * CORRECTION_FACTOR)
-    new_height = int(corrected_height * CORRECTION_FACTOR)
 
-    # Корректируем новый размер на 2 (чтобы избежать ошибок при обработке)
-    new_width, new_height = _correct_resolution(new_width, new_height)
+def plan_conversion(probe: MediaProbe) -> str:
+    """
+    NOOP — файл уже годится для Telegram: mp4, H.264/AAC, не больше
+    целевого размера и разрешения. REMUX — кодеки подходят, но
+    контейнер другой: копируем потоки в mp4 с faststart. Остальное —
+    TRANSCODE.
+    """
+    codecs_ok = (
+        probe.video_codec == 'h264'
+        and probe.audio_codec in (None, 'aac')
+    )
+    fits = (
+        probe.size <= PASSTHROUGH_MAX_BYTES
+        and 0 < min(probe.width, probe.height) <= PASSTHROUGH_MAX_SHORT_SIDE
+    )
+    if not (codecs_ok and fits):
+        return TRANSCODE
+    if 'mp4' in probe.container.split(','):
+        return NOOP
+    return REMUX
+
+
+@dataclass(slots=True)
+class ConversionPlan:
+    """Что делать с файлом: вид, выход и опции ffmpeg для выхода."""
+    kind: str
+    input_path: str
+    output_path: str
+    # опции выхода ffmpeg (для NOOP пусто — файл отдаём как есть)
+    output_args: list[str]
+    duration: float
+
+
+async def prepare_conversion(input_path: str) -> Optional[ConversionPlan]:
+    """
+    ffprobe + выбор плана (plan_conversion). None — перекодировать
+    нужно, но разрешение источника неизвестно.
+    """
+    probe = await asyncio.to_thread(probe_media, input_path)
+    kind = plan_conversion(probe) if probe else TRANSCODE
+    metrics.incr(f'convert.plan.{kind}')
+    if probe is not None:
+        logger.debug(
+            f'План конвертации {input_path}: {kind} ({probe.container}, '
+            f'{probe.video_codec}/{probe.audio_codec}, '
+            f'{probe.width}x{probe.height}, {probe.size} байт)'
+        )
+    if kind == NOOP:
+        return ConversionPlan(kind, input_path, input_path, [], 0.0)
 
+    output_path = input_path.rsplit('.', 1)[0] + '_converted.mp4'
+    if kind == REMUX:
+        assert probe is not None
+        return ConversionPlan(
+            kind, input_path, output_path,
+            ['-c', 'copy', '-movflags', '+faststart'], probe.duration,
+        )
+
+    if probe is None or not probe.width or not probe.height:
+        logger.error('Не удалось получить разрешение видео')
+        return None
+    new_width, new_height = scaled_resolution(probe.width, probe.height)
     logger.debug(
-        f'Новое разрешение видео после сжатия: {new_width}x{new_height}'
+        f'Разрешение видео: {probe.width}x{probe.height} -> '
+        f'{new_width}x{new_height}'
     )
+    return ConversionPlan(
+        kind, input_path, output_path,
+        transcode_args(new_width, new_height), probe.duration,
+    )
+
+
+async def async_convert_to_mp4(
+    input_path: str, *, on_progress: Optional[ProgressCallback] = None
+) -> str:
+    """
+    Готовит видео для Telegram. Если файл уже подходит — возвращает
+    input_path как есть; если подходят только кодеки — ремукс в mp4;
+    иначе перекодирует в H.264 с уменьшением качества на 40%.
+    ffmpeg идёт через общий ffmpeg_runner: без блокировки event loop,
+    с лимитом одновременных кодирований, таймаутом и прогрессом.
+    """
+    plan = await prepare_conversion(input_path)
+    if plan is None:
+        return ''
+    return await run_conversion(plan, on_progress=on_progress)
+
+
+async def run_conversion(
+    plan: ConversionPlan, *, on_progress: Optional[ProgressCallback] = None
+) -> str:
+    """Выполняет готовый план; '' — ffmpeg не справился."""
+    if plan.kind == NOOP:
+        return plan.input_path
 
+    logger.debug(f'Начинаем конвертацию видео: {plan.input_path}')
     try:
-        # Выполняем конвертацию с исправленным разрешением
-        ffmpeg.input(input_path).output(
-            output_path,
-            vf=f'scale={new_width}:{new_height}',
-            vcodec='libx264',
-            acodec='aac',
-            crf=32
-        ).run()
-        logger.debug(f'Конвертация завершена: {output_path}')
-    except ffmpeg.Error as e:
-        logger.error(f'Ошибка при конвертации видео: {e}', exc_info=True)
+        await run_ffmpeg(
+            ['-i', plan.input_path],
+            [[*plan.output_args, plan.output_path]],
+            name=plan.kind,
+            duration=plan.duration,
+            on_progress=on_progress,
+        )
+        logger.debug(f'Конвертация завершена: {plan.output_path}')
+    except FFmpegError as e:
+        logger.error(f'Ошибка при конвертации видео: {e}')
         return ''
 
-    return output_path
+    return plan.output_path
 
 
-async def async_convert_to_mp4(input_path: str) -> str:
-    """Асинхронная версия функции конвертации видео."""
-    return await asyncio.to_thread(convert_to_mp4, input_path)
+def scaled_resolution(width: int, height: int) -> tuple[int, int]:
+    """Уменьшаем разрешение на 40%, стороны кратны 2."""
+    width, height = _correct_resolution(width, height)
+    return _correct_resolution(
+        int(width * CORRECTION_FACTOR), int(height * CORRECTION_FACTOR)
+    )
 
 
-def _get_video_resolution(video_path: str) -> tuple[int, int]:
-    """Получаем разрешение видео"""
-    logger.debug(f'Получаем разрешение видео: {video_path}')
-    try:
-        probe = ffmpeg.probe(
-            video_path, v='error',
-            select_streams='v:0',
-            show_entries='stream=width,height'
-        )
-        width = probe['streams'][0]['width']
-        height = probe['streams'][0]['height']
-        logger.debug(f'Разрешение видео: {width}x{height}')
-        return width, height
-    except ffmpeg.Error as e:
-        logger.error(f'Ошибка при анализе видео: {e}', exc_info=True)
-        return 0, 0
+def transcode_args(width: int, height: int) -> list[str]:
+    """Опции выхода: H.264 CRF 32 + AAC, moov в начале файла."""
+    return [
+        '-vf', f'scale={width}:{height}',
+        '-c:v', 'libx264', '-crf', '32',
+        '-c:a', 'aac',
+        '-movflags', '+faststart',
+    ]
 
 
 def _correct_resolution(width: int, height: int) -> tuple[int, int]:
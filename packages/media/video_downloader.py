@@ -7,22 +7,39 @@ import random
 import re
 import socket
 import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import partial
 from pathlib import Path
-from typing import Tuple
+from typing import Callable, Optional, Tuple
 from urllib.error import HTTPError, URLError
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 import yt_dlp
 from instaloader import Instaloader, Post
 from yt_dlp.utils import DownloadError, ExtractorError
 
-VIDEO_FOLDER = 'videos/'
+from packages.common_settings.settings import settings
+from packages.media.download_limiter import (
+    DownloadLimitTimeout,
+    platform_slot,
+)
+from packages.metrics import metrics
+from packages.redis.redis_conn import get_redis
+from packages.redis.repository import VideoInfoCacheRepository
+
+# каталог по умолчанию; конвейер качает в каталог задачи (MediaWorkspace)
+VIDEO_FOLDER = settings.media.root
 WIDTH_VIDEO = 720  # Примерный размер, можно изменить
 HEIGHT_VIDEO = 1280  # Примерный размер, можно изменить
-INACTIVITY_LIMIT_SECONDS = 15 * 60  # 15 минут
 
 logger = logging.getLogger(__name__)
 
 
+class VideoTooLongError(Exception):
+    """Ролик длиннее PIPELINE_MAX_VIDEO_SECONDS — не скачиваем."""
+
+
 def _ensure_dir(path: str) -> None:
     if not os.path.exists(path):
         os.makedirs(path, exist_ok=True)
@@ -50,8 +67,37 @@ def _platform_from_url(url: str) -> str:
     return "unknown"
 
 
-def _random_human_sleep(min_s: float, max_s: float) -> None:
-    time.sleep(random.uniform(min_s, max_s))
+async def _human_pause(min_s: float, max_s: float) -> None:
+    await asyncio.sleep(random.uniform(min_s, max_s))
+
+
+# Отдельный ограниченный пул под блокирующие yt-dlp/instaloader: медленные
+# загрузки не выедают общий executor asyncio.to_thread
+_download_executor: ThreadPoolExecutor | None = None
+
+
+def _get_download_executor() -> ThreadPoolExecutor:
+    global _download_executor
+    if _download_executor is None:
+        _download_executor = ThreadPoolExecutor(
+            max_workers=settings.pipeline.download_threads,
+            thread_name_prefix="video-download",
+        )
+    return _download_executor
+
+
+def shutdown_download_executor() -> None:
+    global _download_executor
+    if _download_executor is not None:
+        _download_executor.shutdown(wait=False, cancel_futures=True)
+        _download_executor = None
+
+
+async def _run_download(
+    fn: Callable[[str], Tuple[str, str]], url: str
+) -> Tuple[str, str]:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_download_executor(), fn, url)
 
 
 def _yt_dlp_opts(output_path: str) -> dict:
@@ -59,15 +105,29 @@ def _yt_dlp_opts(output_path: str) -> dict:
     Настройки с «человечным» поведением:
     - sleep_interval: паузы между запросами/фрагментами
     - retries/fragment_retries: ограниченные ретраи
-    - ratelimit: мягкое ограничение скорости (имитируем пользователя)
+    - ratelimit: мягкое ограничение скорости (DOWNLOAD_RATELIMIT_BYTES)
+    Частоту и число одновременных загрузок ограничивает platform_slot.
+    - format_sort: не выше DOWNLOAD_MAX_HEIGHT, H.264 + AAC в mp4 —
+      такой файл не нужно перекодировать, хватает ремукса
+    - FFmpegVideoRemuxer вместо FFmpegVideoConvertor: уже mp4 — ничего
+      не делает, иначе только меняет контейнер, без перекодирования
     - noprogress/quiet: тише в stdout
+    - match_filter: слишком длинный ролик отсекается по метаданным,
+      до скачивания (VideoTooLongError)
     """
     return {
         "outtmpl": output_path,
-        "format": "bv+ba/best/best",
+        "match_filter": _duration_filter,
+        "format": "bv*+ba/b",
+        "format_sort": [
+            f"res:{settings.download_limits.max_height}",
+            "vcodec:h264",
+            "acodec:aac",
+            "ext:mp4:m4a",
+        ],
         "merge_output_format": "mp4",
         "postprocessors": [
-            {"key": "FFmpegVideoConvertor", "preferedformat": "mp4"}
+            {"key": "FFmpegVideoRemuxer", "preferedformat": "mp4"}
         ],
         "noprogress": True,
         "quiet": True,
@@ -76,7 +136,7 @@ def _yt_dlp_opts(output_path: str) -> dict:
         "fragment_retries": 3,
         "sleep_interval": 1.0,
         "max_sleep_interval": 3.0,
-        "ratelimit": 2_000_000,  # ~2 MB/s
+        "ratelimit": settings.download_limits.ratelimit_bytes or None,
         # Ограничиваем параллелизм фрагментов (по умолчанию = 1 в yt-dlp)
         # "concurrent_fragment_downloads": 1,
         # Чуть более «обычный» User-Agent (yt-dlp сам ставит современный UA)
@@ -84,6 +144,16 @@ def _yt_dlp_opts(output_path: str) -> dict:
     }
 
 
+def _duration_filter(
+    info: dict, *, incomplete: bool = False
+) -> Optional[str]:
+    limit = settings.pipeline.max_video_seconds
+    duration = info.get("duration")
+    if limit and duration and duration > limit:
+        raise VideoTooLongError(f"{duration:.0f}s > {limit}s")
+    return None
+
+
 def _is_instagram_login_or_rate_error(err: Exception) -> bool:
     """
     Эвристики: когда у Instagram требуется логин / словили 403/429, либо
@@ -172,20 +242,40 @@ def _extract_description_from_info(info: dict) -> str:
     return cand or ""
 
 
-def _try_download_with_yt_dlp(url: str) -> Tuple[str, str]:
+def _try_download_with_yt_dlp(
+    url: str, output_dir: str = VIDEO_FOLDER
+) -> Tuple[str, str]:
     """
     Одна попытка скачать через yt-dlp. Бросает исключение при неудаче.
     """
-    output_path = os.path.join(VIDEO_FOLDER, "%(id)s.%(ext)s")
+    output_path = os.path.join(output_dir, "%(id)s.%(ext)s")
     ydl_opts = _yt_dlp_opts(output_path)
 
+    started = time.monotonic()
     with yt_dlp.YoutubeDL(ydl_opts) as ydl:
         info = ydl.extract_info(url, download=True)  # может бросить
         raw_path = ydl.prepare_filename(info)
         file_path = _finalize_path(raw_path, prefer_ext="mp4")
         desc = _extract_description_from_info(info)
         logger.debug("✅ yt-dlp скачал файл: %s", file_path)
-        return file_path, desc
+    _log_chosen_format(info, file_path, time.monotonic() - started)
+    return file_path, desc
+
+
+def _log_chosen_format(info: dict, file_path: str, elapsed: float) -> None:
+    """Какой формат выбран и сколько он стоил — по каждой загрузке."""
+    try:
+        size = os.path.getsize(file_path)
+    except OSError:
+        size = 0
+    platform = _platform_from_url(info.get("webpage_url") or "")
+    metrics.incr(f"download.{platform}.bytes", size)
+    metrics.observe(f"download.{platform}.latency", elapsed)
+    logger.info(
+        "📥 Формат %s: %sx%s %s/%s, %.1f МБ за %.1fs",
+        info.get("format_id"), info.get("width"), info.get("height"),
+        info.get("vcodec"), info.get("acodec"), size / 1_000_000, elapsed,
+    )
 
 
 def _instagram_shortcode_from_url(url: str) -> str | None:
@@ -199,7 +289,83 @@ def _instagram_shortcode_from_url(url: str) -> str | None:
     return m.group(1) if m else None
 
 
-def _download_with_instaloader(url: str) -> Tuple[str, str]:
+# Параметры, которые не меняют сам ролик (трекинг/шеринг)
+_TRACKING_PARAMS = {
+    "igsh", "igshid", "is_from_webapp", "sender_device", "sender_web_id",
+    "si", "feature", "share_id", "share_app_id", "_r", "_t", "t",
+    "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content",
+    "fbclid", "gclid",
+}
+
+
+def _tiktok_video_id_from_url(url: str) -> str | None:
+    m = re.search(r"/(?:video|photo)/(\d{8,})", url)
+    return m.group(1) if m else None
+
+
+def _youtube_video_id_from_url(url: str) -> str | None:
+    m = re.search(
+        r"(?:youtu\.be/|/shorts/|/embed/|/live/|[?&]v=)([A-Za-z0-9_-]{11})",
+        url,
+    )
+    return m.group(1) if m else None
+
+
+def has_video_id(url: str) -> bool:
+    """
+    В ссылке уже есть id ролика (instagram /reel/<shortcode>, youtube
+    watch?v=, tiktok /video/<id>): канонический URL известен без
+    запроса к платформе.
+    """
+    extract = {
+        "instagram": _instagram_shortcode_from_url,
+        "tiktok": _tiktok_video_id_from_url,
+        "youtube": _youtube_video_id_from_url,
+    }.get(_platform_from_url(url))
+    return bool(extract and extract(url.strip()))
+
+
+def canonical_source_url(url: str) -> str:
+    """
+    Приводит ссылку на ролик к каноническому виду, чтобы разные формы
+    одной и той же ссылки (с трекингом, www/m., /reel/ vs /p/, youtu.be)
+    давали один ключ для кэша и дедупликации.
+    """
+    raw = url.strip()
+    platform = _platform_from_url(raw)
+
+    if platform == "instagram":
+        shortcode = _instagram_shortcode_from_url(raw)
+        if shortcode:
+            return f"https://www.instagram.com/reel/{shortcode}/"
+    elif platform == "tiktok":
+        video_id = _tiktok_video_id_from_url(raw)
+        if video_id:
+            return f"https://www.tiktok.com/video/{video_id}"
+    elif platform == "youtube":
+        video_id = _youtube_video_id_from_url(raw)
+        if video_id:
+            return f"https://www.youtube.com/watch?v={video_id}"
+
+    # Общий случай (в т.ч. короткие vm.tiktok.com без сетевого резолва):
+    # нижний регистр хоста, без www./m., фрагмента и трекинг-параметров
+    parts = urlsplit(raw if "://" in raw else f"https://{raw}")
+    host = (parts.hostname or "").lower()
+    for prefix in ("www.", "m."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in _TRACKING_PARAMS
+        and not k.lower().startswith("utm_")
+    ))
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https", host, path, query, ""))
+
+
+def _download_with_instaloader(
+    url: str, output_dir: str = VIDEO_FOLDER
+) -> Tuple[str, str]:
     """
     Фолбэк для Instagram через instaloader==4.14.2.
     Скачиваем видео поста/рила по shortcode, возвращаем путь и подпись.
@@ -213,11 +379,11 @@ def _download_with_instaloader(url: str) -> Tuple[str, str]:
     if not shortcode:
         raise ValueError("Не удалось извлечь Instagram shortcode из URL.")
 
-    _ensure_dir(VIDEO_FOLDER)
+    _ensure_dir(output_dir)
 
     # Настройки: сохраняем только медиа, без доп. файлов и альбомов
     L = Instaloader(
-        dirname_pattern=VIDEO_FOLDER.rstrip("/"),
+        dirname_pattern=output_dir.rstrip("/"),
         filename_pattern="{shortcode}",
         download_pictures=False,
         download_videos=True,
@@ -229,9 +395,6 @@ def _download_with_instaloader(url: str) -> Tuple[str, str]:
         quiet=True,
     )
 
-    # «Человечные» паузы
-    _random_human_sleep(0.8, 2.2)
-
     post = Post.from_shortcode(L.context, shortcode)
     caption = post.caption or ""
 
@@ -239,11 +402,11 @@ def _download_with_instaloader(url: str) -> Tuple[str, str]:
     # все элементы, но в большинстве случаев Reels — одиночное видео)
     L.download_post(post, target=".")
 
-    # Instaloader сохраняет как {shortcode}.mp4 в VIDEO_FOLDER
-    candidate = Path(VIDEO_FOLDER) / f"{shortcode}.mp4"
+    # Instaloader сохраняет как {shortcode}.mp4 в output_dir
+    candidate = Path(output_dir) / f"{shortcode}.mp4"
     if not candidate.exists():
         # возможны варианты именования; попробуем найти любой .mp4 с shortcode
-        for p in Path(VIDEO_FOLDER).glob(f"{shortcode}*.mp4"):
+        for p in Path(output_dir).glob(f"{shortcode}*.mp4"):
             candidate = p
             break
 
@@ -256,15 +419,26 @@ def _download_with_instaloader(url: str) -> Tuple[str, str]:
     return str(candidate), caption
 
 
-def download_video_and_description(url: str) -> Tuple[str, str]:
+async def async_download_video_and_description(
+    url: str, output_dir: str = VIDEO_FOLDER
+) -> Tuple[str, str]:
     """
-    Скачивает видео и возвращает (path, description).
+    Скачивает видео в output_dir и возвращает (path, description).
     1) yt-dlp с несколькими повторами и «человечными» паузами
     2) При Instagram-ошибках типа 403/429/login — фолбэк на instaloader
     (одна попытка)
+    Паузы и экспоненциальный backoff — asyncio.sleep: поток занят только
+    на время самого вызова yt-dlp/instaloader, и это отдельный пул
+    загрузок, а не общий executor asyncio.to_thread.
+    Слишком длинный ролик — VideoTooLongError, не дождались лимита
+    платформы — DownloadLimitTimeout (без повторов).
     """
-    _ensure_dir(VIDEO_FOLDER)
+    _ensure_dir(output_dir)
     platform = _platform_from_url(url)
+    download_yt_dlp = partial(_try_download_with_yt_dlp, output_dir=output_dir)
+    download_instaloader = partial(
+        _download_with_instaloader, output_dir=output_dir
+    )
 
     max_attempts = 3
     base_sleep = 1.0  # сек; будет нарастать экспоненциально
@@ -273,8 +447,13 @@ def download_video_and_description(url: str) -> Tuple[str, str]:
     for attempt in range(1, max_attempts + 1):
         try:
             # Небольшая человеческая задержка перед каждой попыткой
-            _random_human_sleep(0.6, 1.8)
-            return _try_download_with_yt_dlp(url)
+            await _human_pause(0.6, 1.8)
+            # ждём слот платформы, а не ловим 403/429 от параллельных загрузок
+            async with platform_slot(platform):
+                return await _run_download(download_yt_dlp, url)
+        except (VideoTooLongError, DownloadLimitTimeout):
+            # не сбой загрузки: повторы не помогут, решает вызывающий
+            raise
         except (DownloadError, ExtractorError) as e:
             last_exc = e
             logger.warning(
@@ -289,7 +468,13 @@ def download_video_and_description(url: str) -> Tuple[str, str]:
                     "Переходим на instaloader из-за ограничений Instagram…"
                 )
                 try:
-                    return _download_with_instaloader(url)
+                    await _human_pause(0.8, 2.2)
+                    async with platform_slot(platform):
+                        return await _run_download(
+                            download_instaloader, url
+                        )
+                except DownloadLimitTimeout:
+                    raise
                 except Exception as ie:
                     logger.error(
                         "instaloader тоже не смог: %s", ie, exc_info=True
@@ -305,7 +490,7 @@ def download_video_and_description(url: str) -> Tuple[str, str]:
                 )
                 delay = min(delay, 6.0)
                 logger.debug("Повтор через %.1f сек…", delay)
-                time.sleep(delay)
+                await asyncio.sleep(delay)
                 continue
             else:
                 break
@@ -321,7 +506,7 @@ def download_video_and_description(url: str) -> Tuple[str, str]:
                     0.1, 0.6
                 )
                 delay = min(delay, 5.0)
-                time.sleep(delay)
+                await asyncio.sleep(delay)
                 continue
             break
         except Exception as e:
@@ -334,31 +519,94 @@ def download_video_and_description(url: str) -> Tuple[str, str]:
     return "", ""
 
 
-async def async_download_video_and_description(url: str) -> Tuple[str, str]:
+@dataclass(slots=True)
+class VideoInfo:
+    """Метаданные ролика без скачивания (yt-dlp, download=False)."""
+    id: str
+    duration: Optional[float]
+    filesize_estimate: Optional[int]
+    description: str
+    canonical_url: str
+
+
+def _estimate_filesize(info: dict) -> Optional[int]:
     """
-    Асинхронная обёртка поверх блокирующей загрузки.
+    Размер из метаданных: точный, приблизительный, сумма выбранных
+    дорожек или битрейт × длительность (tbr в Кбит/с).
     """
-    return await asyncio.to_thread(download_video_and_description, url)
+    size = info.get("filesize") or info.get("filesize_approx")
+    if size:
+        return int(size)
+    parts = info.get("requested_formats") or []
+    sizes = [
+        f.get("filesize") or f.get("filesize_approx") or 0 for f in parts
+    ]
+    if sizes and all(sizes):
+        return int(sum(sizes))
+    if info.get("tbr") and info.get("duration"):
+        return int(info["tbr"] * info["duration"] * 125)
+    return None
 
 
-async def cleanup_old_videos() -> None:
-    """Фоновая задача, удаляющая старые видеофайлы без активности."""
-    while True:
-        logger.info('Фоновая задача начала работать')
-        now = time.time()
-        if os.path.exists(VIDEO_FOLDER):
-            for filename in os.listdir(VIDEO_FOLDER):
-                file_path = os.path.join(VIDEO_FOLDER, filename)
-                try:
-                    if os.path.isfile(file_path):
-                        last_access = os.path.getatime(file_path)
-                        if now - last_access > INACTIVITY_LIMIT_SECONDS:
-                            os.remove(file_path)
-                            logger.debug(
-                                f'Удалён неиспользуемый файл: {file_path}'
-                            )
-                except Exception as e:
-                    logger.error(
-                        f'Ошибка при удалении файла: {file_path} — {e}'
-                    )
-        await asyncio.sleep(INACTIVITY_LIMIT_SECONDS)
+def _probe_with_yt_dlp(url: str) -> VideoInfo:
+    """Один запрос метаданных через yt-dlp, без скачивания."""
+    opts = {
+        "quiet": True,
+        "noprogress": True,
+        "nocheckcertificate": True,
+        "skip_download": True,
+        "noplaylist": True,
+    }
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        info = ydl.extract_info(url, download=False)  # может бросить
+    info = info or {}
+    return VideoInfo(
+        id=str(info.get("id") or ""),
+        duration=info.get("duration"),
+        filesize_estimate=_estimate_filesize(info),
+        description=_extract_description_from_info(info),
+        canonical_url=canonical_source_url(info.get("webpage_url") or url),
+    )
+
+
+async def probe_video_info(url: str) -> Optional[VideoInfo]:
+    """
+    Быстрые метаданные ролика до скачивания: длительность, оценка
+    размера, подпись и канонический URL (короткие ссылки резолвятся).
+    Кэшируются в Redis по URL запроса на сутки. Ошибки не фатальны —
+    вернём None, и пайплайн просто пойдёт качать.
+    """
+    key = canonical_source_url(url)
+    try:
+        redis = await get_redis()
+        cached = await VideoInfoCacheRepository.get(redis, key)
+    except Exception as e:
+        logger.warning("Кэш метаданных недоступен: %s", e)
+        redis, cached = None, None
+    if cached is not None:
+        try:
+            return VideoInfo(**cached)
+        except TypeError:
+            # старый формат записи — перезапросим
+            pass
+
+    try:
+        async with platform_slot(_platform_from_url(url)):
+            loop = asyncio.get_running_loop()
+            info = await loop.run_in_executor(
+                _get_download_executor(), _probe_with_yt_dlp, url
+            )
+    except Exception as e:
+        logger.info("Метаданные без скачивания не получены: %s", e)
+        return None
+
+    if redis is not None:
+        try:
+            await VideoInfoCacheRepository.set(redis, key, asdict(info))
+        except Exception as e:
+            logger.warning("Не удалось сохранить метаданные: %s", e)
+    logger.debug(
+        "ℹ️ Метаданные %s: %ss, ~%s байт",
+        info.canonical_url, info.duration, info.filesize_estimate,
+    )
+    return info
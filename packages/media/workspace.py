@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import shutil
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+from packages.common_settings.settings import settings
+from packages.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+_MB = 1024 * 1024
+# отметка «каталог задачи жив»: владелец обновляет её mtime на каждой
+# уборке, чужие уборки (другие процессы) такой каталог не трогают
+_LIVE_MARKER = '.live'
+
+
+class JobDir:
+    """
+    Каталог одной задачи в рабочей папке. Пока на него есть ссылки
+    (задача, фоновая загрузка в канал и т.п.), уборка его не трогает;
+    после последнего release() каталог удаляется целиком.
+    """
+
+    def __init__(self, workspace: MediaWorkspace, path: Path) -> None:
+        self.workspace = workspace
+        self.path = path
+        self._refs = 1
+
+    def file(self, name: str) -> str:
+        return str(self.path / name)
+
+    def acquire(self) -> None:
+        self._refs += 1
+
+    def release(self) -> None:
+        self._refs -= 1
+        if self._refs == 0:
+            self.workspace._finish(self)
+
+
+@dataclass(slots=True)
+class SweepStats:
+    """Итог одного прохода уборки."""
+    total_bytes: int = 0
+    entries: int = 0
+    evicted: int = 0
+    evicted_bytes: int = 0
+    free_bytes: int = 0
+
+
+class MediaWorkspace:
+    """
+    Рабочая папка для медиа: у каждой задачи свой подкаталог
+    (new_job), который удаляется, когда задача отпустила его.
+    Всё, что осталось без владельца (падение процесса, старые файлы
+    в корне, папка audio/), убирает периодический sweep(): по возрасту
+    (mtime — atime часто выключен через noatime), а при превышении
+    размера или нехватке места на диске — от старых к новым.
+    Не трогает никогда: каталоги с живой отметкой _LIVE_MARKER (задачи
+    любого процесса на том же диске) и записи моложе live_grace (в т.ч.
+    задачи, созданные уже после снимка активных).
+    Обход диска и удаление каталогов выполняются в потоке, не в event
+    loop'е. В размер рабочей папки входят и защищённые записи: они не
+    вытесняются, но из-за них вытесняются старые.
+    """
+
+    def __init__(
+        self,
+        root: str = settings.media.root,
+        *,
+        extra_roots: Iterable[str] = settings.media.extra_root_list,
+        max_bytes: int = settings.media.max_mb * _MB,
+        max_age: float = settings.media.max_age,
+        min_free_bytes: int = settings.media.min_free_mb * _MB,
+        live_grace: float = 3 * settings.media.sweep_interval,
+    ) -> None:
+        self.root = Path(root)
+        self.extra_roots = [Path(p) for p in extra_roots]
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.min_free_bytes = min_free_bytes
+        self.live_grace = live_grace
+        self._active: dict[str, JobDir] = {}
+
+    def new_job(self) -> JobDir:
+        """Создаёт каталог под задачу; ссылка одна — у вызывающего."""
+        path = self.root / f'job-{uuid.uuid4().hex[:12]}'
+        path.mkdir(parents=True, exist_ok=True)
+        (path / _LIVE_MARKER).touch()
+        job = JobDir(self, path)
+        self._active[path.name] = job
+        metrics.gauge('media.workspace.active_jobs', len(self._active))
+        return job
+
+    def _finish(self, job: JobDir) -> None:
+        self._active.pop(job.path.name, None)
+        metrics.gauge('media.workspace.active_jobs', len(self._active))
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # вне event loop'а (скрипты, тесты) — удаляем сразу
+            _remove_job_dir(job.path)
+            return
+        # rmtree крупного каталога — диск, не для event loop'а;
+        # до удаления каталог защищён отметкой _LIVE_MARKER
+        loop.run_in_executor(None, _remove_job_dir, job.path)
+
+    async def sweep(self) -> SweepStats:
+        stats = await asyncio.to_thread(
+            self._sweep_sync, frozenset(self._active)
+        )
+        metrics.gauge('media.workspace.bytes', stats.total_bytes)
+        metrics.gauge('media.workspace.entries', stats.entries)
+        metrics.gauge('media.disk.free_bytes', stats.free_bytes)
+        metrics.incr('media.workspace.evicted', stats.evicted)
+        metrics.incr('media.workspace.evicted_bytes', stats.evicted_bytes)
+        if stats.evicted:
+            logger.info(
+                '🧹 Уборка медиа: удалено %s (%.1f МБ), осталось %.1f МБ, '
+                'свободно %.1f МБ',
+                stats.evicted, stats.evicted_bytes / _MB,
+                stats.total_bytes / _MB, stats.free_bytes / _MB,
+            )
+        return stats
+
+    async def run_sweeper(
+        self, interval: float = settings.media.sweep_interval
+    ) -> None:
+        """Фоновая задача: уборка каждые interval секунд."""
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error('Ошибка уборки медиа: %s', e, exc_info=True)
+            await asyncio.sleep(interval)
+
+    # ---------- выполняется в потоке ----------
+
+    def _sweep_sync(self, active: frozenset[str]) -> SweepStats:
+        now = time.time()
+        for name in active:
+            # продлеваем отметку своих задач для уборок других процессов
+            _touch(self.root / name / _LIVE_MARKER)
+        stats = SweepStats()
+        entries: list[tuple[float, int, Path]] = []
+        for root in [self.root, *self.extra_roots]:
+            if not root.is_dir():
+                continue
+            for entry in root.iterdir():
+                size, mtime = _usage(entry)
+                # защищённые записи не удаляем, но место они занимают
+                stats.total_bytes += size
+                stats.entries += 1
+                if root == self.root and entry.name in active:
+                    continue
+                if self._is_live(entry, now):
+                    continue
+                if now - mtime < self.live_grace:
+                    # свежая запись: могла появиться после снимка active
+                    continue
+                entries.append((mtime, size, entry))
+        stats.free_bytes = _free_bytes(self.root)
+
+        entries.sort(key=lambda e: e[0])  # сначала самые старые
+        for mtime, size, entry in entries:
+            expired = now - mtime > self.max_age
+            too_big = stats.total_bytes > self.max_bytes
+            low_disk = stats.free_bytes < self.min_free_bytes
+            if not (expired or too_big or low_disk):
+                # дальше только более свежие записи
+                break
+            if not _remove(entry):
+                continue
+            stats.total_bytes -= size
+            stats.free_bytes += size
+            stats.entries -= 1
+            stats.evicted += 1
+            stats.evicted_bytes += size
+        return stats
+
+    def _is_live(self, entry: Path, now: float) -> bool:
+        try:
+            marker = (entry / _LIVE_MARKER).stat()
+        except OSError:
+            return False
+        return now - marker.st_mtime < self.live_grace
+
+
+def _touch(path: Path) -> None:
+    try:
+        os.utime(path)
+    except OSError:
+        # каталог уже удалён — задача завершилась во время уборки
+        pass
+
+
+def _usage(entry: Path) -> tuple[int, float]:
+    """Размер и самый свежий mtime файла или каталога целиком."""
+    try:
+        st = entry.stat()
+    except OSError:
+        return 0, 0.0
+    if not entry.is_dir():
+        return st.st_size, st.st_mtime
+    size, mtime = 0, st.st_mtime
+    for dirpath, _, filenames in os.walk(entry):
+        for name in filenames:
+            try:
+                fst = os.stat(os.path.join(dirpath, name))
+            except OSError:
+                continue
+            size += fst.st_size
+            mtime = max(mtime, fst.st_mtime)
+    return size, mtime
+
+
+def _remove(entry: Path) -> bool:
+    try:
+        if entry.is_dir():
+            shutil.rmtree(entry)
+        else:
+            entry.unlink()
+        return True
+    except FileNotFoundError:
+        return True
+    except OSError as e:
+        logger.warning('Не удалось удалить %s: %s', entry, e)
+        return False
+
+
+def _remove_job_dir(path: Path) -> None:
+    shutil.rmtree(path, ignore_errors=True)
+    logger.debug('🧹 Удалён каталог задачи: %s', path)
+
+
+def _free_bytes(path: Path) -> int:
+    try:
+        return shutil.disk_usage(path if path.exists() else '.').free
+    except OSError:
+        return 0
+
+
+_workspace: Optional[MediaWorkspace] = None
+
+
+def get_media_workspace() -> MediaWorkspace:
+    global _workspace
+    if _workspace is None:
+        _workspace = MediaWorkspace()
+    return _workspace
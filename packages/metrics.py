@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+
+@dataclass(slots=True)
+class Timing:
+    """Агрегат по длительностям: количество, сумма и максимум (сек)."""
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def avg(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class Metrics:
+    """
+    Простейший in-process реестр метрик: счётчики, gauge и тайминги.
+    Потокобезопасен — пишется и из event loop, и из рабочих потоков.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._timings: dict[str, Timing] = {}
+
+    def incr(self, name: str, value: float = 1.0) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0.0) + value
+
+    def gauge(self, name: str, value: float) -> None:
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            t = self._timings.setdefault(name, Timing())
+            t.count += 1
+            t.total += seconds
+            t.max = max(t.max, seconds)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(name, time.monotonic() - started)
+
+    def snapshot(self) -> dict[str, Any]:
+        """Копия текущих значений (для логов и команды /stats)."""
+        with self._lock:
+            return {
+                'uptime': time.monotonic() - self._started,
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'timings': {
+                    k: {
+                        'count': v.count, 'avg': v.avg,
+                        'max': v.max, 'total': v.total,
+                    }
+                    for k, v in self._timings.items()
+                },
+            }
+
+
+metrics = Metrics()
+
+__all__ = ['Metrics', 'Timing', 'metrics']
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import logging
+
+from packages.notifications.base import Notifier
+
+logger = logging.getLogger(__name__)
+
+
+class FanoutNotifier:
+    """
+    Рассылает уведомления основному получателю и всем подписчикам.
+    Ошибки подписчиков не мешают основному получателю.
+    Список подписчиков может пополняться на лету.
+    error() подписчикам не пересылается: они получают тот же результат
+    (None при сбое) и сообщают об ошибке сами — иначе увидят её дважды.
+    """
+
+    def __init__(self, primary: Notifier, followers: list[Notifier]):
+        self.primary = primary
+        self.followers = followers
+
+    async def info(self, text: str) -> None:
+        await self.primary.info(text)
+        await self._broadcast('info', text)
+
+    async def progress(self, pct: int, text: str = '') -> None:
+        await self.primary.progress(pct, text)
+        await self._broadcast('progress', pct, text)
+
+    async def error(self, text: str) -> None:
+        await self.primary.error(text)
+
+    async def _broadcast(self, method: str, *args: object) -> None:
+        # копия: подписчики могут добавляться во время рассылки
+        for follower in list(self.followers):
+            try:
+                await getattr(follower, method)(*args)
+            except Exception as e:
+                logger.warning('Не удалось уведомить подписчика: %s', e)
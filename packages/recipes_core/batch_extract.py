@@ -0,0 +1,279 @@
+"""
+Пакетное переизвлечение сохранённых рецептов через LLM (бэкфилл после
+смены SYSTEM_PROMPT_RU / PROMPT_VERSION).
+
+Запуск:
+    python -m packages.recipes_core.batch_extract \
+        --chunk-size 100 --concurrency 4 --rps 2
+
+- рецепты читаются из Postgres пачками (keyset по id);
+- внутри пачки — до --concurrency запросов к LLM одновременно и не
+  чаще --rps запросов в секунду;
+- результаты пачки пишутся одной транзакцией (bulk UPDATE + связи
+  ингредиентов), после коммита обновляется checkpoint — повторный
+  запуск продолжит с места остановки; id, на которых LLM упал,
+  копятся в checkpoint.failed;
+- --dry-run ничего не пишет в БД (удобно с фейковым ChatClient).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional, Sequence
+
+from packages.common_settings.settings import settings
+from packages.db.database import Database
+from packages.db.models import Recipe
+from packages.db.repository import (
+    IngredientRepository,
+    RecipeIngredientRepository,
+    RecipeRepository,
+)
+from packages.logging_config import setup_logging
+from packages.recipes_core.deepseek_parsers import RecipeExtraction
+from packages.recipes_core.promts import PROMPT_VERSION
+from packages.recipes_core.services.extract_recipe import (
+    AsyncChatClient,
+    LLMRecipeExtractor,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT = '.batch_extract.checkpoint.json'
+
+
+class RateLimiter:
+    """Не чаще rate вызовов в секунду (равномерно, без всплесков)."""
+
+    def __init__(self, rate: float) -> None:
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> None:
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+@dataclass
+class Checkpoint:
+    """Прогресс бэкфилла; пишется атомарно после каждой пачки."""
+    last_id: int = 0
+    done: int = 0
+    skipped: int = 0
+    failed: list[int] = field(default_factory=list)
+    prompt_version: int = PROMPT_VERSION
+
+    @classmethod
+    def load(cls, path: Path) -> Checkpoint:
+        if not path.exists():
+            return cls()
+        data = json.loads(path.read_text(encoding='utf-8'))
+        cp = cls(**data)
+        if cp.prompt_version != PROMPT_VERSION:
+            logger.warning(
+                'Checkpoint от версии промпта %s, текущая %s — начинаем '
+                'заново', cp.prompt_version, PROMPT_VERSION
+            )
+            return cls()
+        return cp
+
+    def save(self, path: Path) -> None:
+        tmp = path.with_suffix(path.suffix + '.tmp')
+        tmp.write_text(
+            json.dumps(asdict(self), ensure_ascii=False), encoding='utf-8'
+        )
+        os.replace(tmp, path)
+
+
+def recipe_input(recipe: Recipe) -> str:
+    """Текст сохранённого рецепта как «описание» для LLM."""
+    ingredients = '\n'.join(f'- {i.name}' for i in recipe.ingredients)
+    return (
+        f'{recipe.title}\n{recipe.description or ""}\n'
+        f'Ингредиенты:\n{ingredients}'
+    )
+
+
+def is_usable(data: RecipeExtraction) -> bool:
+    # не затираем рецепт ответом, из которого ничего не распарсилось
+    return data.is_usable
+
+
+class BatchExtractor:
+    """
+    Прогон сохранённых рецептов через LLMRecipeExtractor. Extractor
+    передаётся снаружи, поэтому раннер проверяется на фейковом
+    AsyncChatClient без сети.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        extractor: LLMRecipeExtractor,
+        *,
+        checkpoint_path: Path,
+        chunk_size: int = 100,
+        concurrency: int = 4,
+        rps: float = 2.0,
+        limit: Optional[int] = None,
+        dry_run: bool = False,
+    ) -> None:
+        self.db = db
+        self.extractor = extractor
+        self.checkpoint_path = checkpoint_path
+        self.chunk_size = chunk_size
+        self.limit = limit
+        self.dry_run = dry_run
+        self._slots = asyncio.Semaphore(concurrency)
+        self._rate = RateLimiter(rps)
+
+    async def run(self, *, restart: bool = False) -> Checkpoint:
+        cp = Checkpoint() if restart else Checkpoint.load(
+            self.checkpoint_path
+        )
+        logger.info('▶️ Бэкфилл рецептов с id > %s', cp.last_id)
+        processed = 0
+        while self.limit is None or processed < self.limit:
+            size = self.chunk_size
+            if self.limit is not None:
+                size = min(size, self.limit - processed)
+            async with self.db.session() as session:
+                recipes = await RecipeRepository.get_chunk_after(
+                    session, cp.last_id, size
+                )
+            if not recipes:
+                break
+
+            results = await asyncio.gather(
+                *(self._extract(r) for r in recipes)
+            )
+            ok = {
+                r.id: data for r, data in zip(recipes, results)
+                if data is not None and is_usable(data)
+            }
+            if not self.dry_run:
+                await self._write_back(ok)
+
+            cp.failed.extend(
+                r.id for r, d in zip(recipes, results) if d is None
+            )
+            cp.skipped += sum(
+                1 for d in results if d is not None and not is_usable(d)
+            )
+            cp.done += len(ok)
+            cp.last_id = recipes[-1].id
+            processed += len(recipes)
+            if not self.dry_run:
+                cp.save(self.checkpoint_path)
+            logger.info(
+                '✅ До id=%s: обновлено %s, пропущено %s, ошибок %s',
+                cp.last_id, cp.done, cp.skipped, len(cp.failed)
+            )
+        return cp
+
+    async def _extract(self, recipe: Recipe) -> Optional[RecipeExtraction]:
+        async with self._slots:
+            await self._rate.wait()
+            try:
+                return await self.extractor.extract(
+                    description=recipe_input(recipe), recognized_text=''
+                )
+            except Exception as e:
+                logger.warning('Рецепт %s: ошибка LLM: %s', recipe.id, e)
+                return None
+
+    async def _write_back(self, results: dict[int, RecipeExtraction]) -> None:
+        if not results:
+            return
+        async with self.db.session() as session:
+            await RecipeRepository.bulk_update_texts(session, [
+                {
+                    'id': recipe_id,
+                    'title': data.title,
+                    'description': data.instructions_text,
+                }
+                for recipe_id, data in results.items()
+            ])
+            id_by_name = await IngredientRepository.bulk_get_or_create(
+                session,
+                [n for d in results.values() for n in d.ingredients_list],
+            )
+            await RecipeIngredientRepository.bulk_replace(session, {
+                recipe_id: [
+                    id_by_name[n] for n in data.ingredients_list
+                    if n in id_by_name
+                ]
+                for recipe_id, data in results.items()
+            })
+
+
+def _parse_args(argv: Optional[Sequence[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog='python -m packages.recipes_core.batch_extract',
+        description='Переизвлечение сохранённых рецептов через LLM.',
+    )
+    parser.add_argument('--chunk-size', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument(
+        '--rps', type=float, default=2.0,
+        help='запросов к LLM в секунду (0 — без ограничения)',
+    )
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument(
+        '--checkpoint', type=Path, default=Path(DEFAULT_CHECKPOINT)
+    )
+    parser.add_argument(
+        '--restart', action='store_true', help='игнорировать checkpoint'
+    )
+    parser.add_argument(
+        '--dry-run', action='store_true', help='не писать в БД'
+    )
+    return parser.parse_args(argv)
+
+
+async def main(argv: Optional[Sequence[str]] = None) -> None:
+    # импорт здесь: HTTP-клиент нужен только при реальном запуске
+    from packages.integrations.deepseek_api import (
+        close_deepseek_client,
+        get_deepseek_client,
+    )
+
+    args = _parse_args(argv)
+    client: AsyncChatClient = get_deepseek_client()
+    db = Database(
+        db_url=settings.db.sqlalchemy_url(use_async=True),
+        echo=settings.debug,
+    )
+    runner = BatchExtractor(
+        db,
+        LLMRecipeExtractor(client),
+        checkpoint_path=args.checkpoint,
+        chunk_size=args.chunk_size,
+        concurrency=args.concurrency,
+        rps=args.rps,
+        limit=args.limit,
+        dry_run=args.dry_run,
+    )
+    try:
+        await runner.run(restart=args.restart)
+    finally:
+        await close_deepseek_client()
+        db.dispose()
+
+
+if __name__ == '__main__':
+    setup_logging()
+    asyncio.run(main())
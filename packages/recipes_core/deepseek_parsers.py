@@ -5,13 +5,26 @@ from typing import List
 
 from pydantic import BaseModel, Field
 
+# заглушки разделов, которые не удалось распарсить
+NO_TITLE = 'Не указано'
+NO_INSTRUCTIONS = 'Не указан'
+NO_INGREDIENTS = 'Не указаны'
+
 
 class RecipeExtraction(BaseModel):
-    title: str = Field(default='Не указано')
-    instructions_text: str = Field(default='Не указан')  # текст с нумерацией
-    ingredients_text: str = Field(default='Не указаны')  # текст с маркерами
+    title: str = Field(default=NO_TITLE)
+    instructions_text: str = Field(default=NO_INSTRUCTIONS)  # с нумерацией
+    ingredients_text: str = Field(default=NO_INGREDIENTS)  # с маркерами
     raw: str = ''  # сырой ответ (для дебага)
 
+    @property
+    def is_usable(self) -> bool:
+        """Есть и название, и шаги — не заглушки парсера."""
+        return (
+            self.title.strip() not in ('', NO_TITLE)
+            and self.instructions_text.strip() not in ('', NO_INSTRUCTIONS)
+        )
+
     @property
     def ingredients_list(self) -> List[str]:
         return [re.sub(r'^[-*]\s*', '', line).strip()
@@ -19,53 +32,105 @@ class RecipeExtraction(BaseModel):
                 if line.strip() and re.match(r'^[-*]\s*', line.strip())]
 
 
-def parse_llm_answer(content: str) -> RecipeExtraction:
+# разделы ответа, о готовности которых сообщает IncrementalRecipeParser
+TITLE = 'title'
+INSTRUCTIONS = 'instructions'
+INGREDIENTS = 'ingredients'
+
+
+class IncrementalRecipeParser:
     """
-    Парсим формат:
+    Разбирает ответ LLM по мере поступления токенов (stream=True).
+
+    feed() принимает очередной кусок текста и возвращает разделы,
+    которые к этому моменту гарантированно дописаны: (TITLE, 'Борщ'),
+    (INSTRUCTIONS, '1. ...'), (INGREDIENTS, '- ...'). Раздел считается
+    готовым, когда закончилась его строка (название) или начался
+    следующий раздел. finish() возвращает итоговый RecipeExtraction.
+
+    Формат:
     Название рецепта: ...
     Рецепт:
     1. ...
     Ингредиенты:
     - ...
     """
-    lines = [line.strip() for line in (content or '').splitlines()]
-    title = ''
-    rec = []
-    ing = []
 
-    mode = None  # 'recipe' | 'ingredients' | None
-    for line in lines:
+    def __init__(self) -> None:
+        self._raw: list[str] = []
+        self._tail = ''  # недописанная строка
+        self._mode: str | None = None  # INSTRUCTIONS | INGREDIENTS | None
+        self.title = ''
+        self.rec: list[str] = []
+        self.ing: list[str] = []
+
+    def feed(self, delta: str) -> list[tuple[str, str]]:
+        self._raw.append(delta)
+        self._tail += delta
+        events: list[tuple[str, str]] = []
+        while '\n' in self._tail:
+            line, self._tail = self._tail.split('\n', 1)
+            events.extend(self._consume(line.strip()))
+        return events
+
+    def finish(self) -> RecipeExtraction:
+        if self._tail:
+            self._consume(self._tail.strip())
+            self._tail = ''
+        return RecipeExtraction(
+            title=self.title or NO_TITLE,
+            instructions_text='\n'.join(self.rec) or NO_INSTRUCTIONS,
+            ingredients_text='\n'.join(self.ing) or NO_INGREDIENTS,
+            raw=''.join(self._raw),
+        )
+
+    def _consume(self, line: str) -> list[tuple[str, str]]:
         if not line:
-            continue
+            return []
         if line.startswith('Название рецепта:'):
-            title = line.split(':', 1)[1].strip()
-            mode = None
-            continue
+            events = self._close_section()
+            self.title = line.split(':', 1)[1].strip()
+            self._mode = None
+            if self.title:
+                events.append((TITLE, self.title))
+            return events
         if line.startswith('Рецепт:'):
-            mode = 'recipe'
+            events = self._close_section()
+            self._mode = INSTRUCTIONS
             tail = line.replace('Рецепт:', '', 1).strip()
             if tail:
-                rec.append(tail)
-            continue
+                self.rec.append(tail)
+            return events
         if line.startswith('Ингредиенты:'):
-            mode = 'ingredients'
+            events = self._close_section()
+            self._mode = INGREDIENTS
             tail = line.replace('Ингредиенты:', '', 1).strip()
             if tail:
-                ing.append(tail)
-            continue
+                self.ing.append(tail)
+            return events
 
-        if mode == 'recipe':
+        if self._mode == INSTRUCTIONS:
             # принимаем '1. ...' или просто строку
-            rec.append(line)
-        elif mode == 'ingredients':
+            self.rec.append(line)
+        elif self._mode == INGREDIENTS:
             # принимаем '- ...' или '* ...' или просто строку
             if not re.match(r'^[-*]\s+', line):
                 line = f'- {line}'
-            ing.append(line)
-
-    return RecipeExtraction(
-        title=title or 'Не указано',
-        instructions_text='\n'.join(rec) or 'Не указан',
-        ingredients_text='\n'.join(ing) or 'Не указаны',
-        raw=content or '',
-    )
+            self.ing.append(line)
+        return []
+
+    def _close_section(self) -> list[tuple[str, str]]:
+        if self._mode == INSTRUCTIONS and self.rec:
+            return [(INSTRUCTIONS, '\n'.join(self.rec))]
+        if self._mode == INGREDIENTS and self.ing:
+            return [(INGREDIENTS, '\n'.join(self.ing))]
+        return []
+
+
+def parse_llm_answer(content: str) -> RecipeExtraction:
+    """
+    Парсим полный ответ LLM (формат — см. IncrementalRecipeParser).
+    """
+    parser = IncrementalRecipeParser()
+    parser.feed(content or '')
+    return parser.finish()
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+# количество + единица: «200 г», «1,5 ст. л.», «2 cups», «½ tsp»
+_QUANTITY_RE = re.compile(
+    r'(?:\d+(?:[.,/]\d+)?|[½¼¾⅓⅔])\s*'
+    r'(?:г|гр|кг|мг|мл|л|ст\.?\s?л|ч\.?\s?л|шт|стак|щеп|зуб|пуч|упак|'
+    r'g|kg|mg|ml|l|tbsp|tsp|cups?|oz|lb|pcs?)\b\.?',
+    re.IGNORECASE,
+)
+# маркированный пункт списка: «-», «•», «*», «▪️», эмодзи-буллет
+# (только явный набор — иначе «!!» или «😍» в начале строки сойдут
+# за пункт списка)
+_BULLET_RE = re.compile(r'^\s*[-–—•·*▪▫◾◽●○◦➖➤►▶✓✔✅☑🔸🔹👉]')
+# нумерованный шаг: «1.», «2)», «Шаг 3:», «1️⃣»
+_STEP_RE = re.compile(
+    r'^\s*(?:\d{1,2}\s*[.)]|\d️?⃣|(?:шаг|step)\s*\d+)',
+    re.IGNORECASE,
+)
+_SECTION_RE = re.compile(
+    r'\b(?:ингредиент\w*|продукт\w*|понадобится|приготовлени\w*|'
+    r'способ|рецепт|ingredients?|instructions?|method|directions?)\b',
+    re.IGNORECASE,
+)
+_COOKING_VERB_RE = re.compile(
+    r'\b(?:нареж\w*|нарез\w*|смеша\w*|добав\w*|обжар\w*|жар\w*|вар\w*|'
+    r'запек\w*|выпек\w*|туш\w*|взбе\w*|посол\w*|духовк\w*|'
+    r'chop\w*|mix\w*|add\w*|fry\w*|bake\w*|boil\w*|stir\w*|whisk\w*)',
+    re.IGNORECASE,
+)
+
+# сколько признаков «хватает» для полного балла по каждой группе
+_ENOUGH_INGREDIENTS = 4
+_ENOUGH_STEPS = 3
+
+
+@dataclass(slots=True)
+class DescriptionScore:
+    """Признаки рецепта в описании ролика и итоговая оценка 0..1."""
+    ingredient_lines: int
+    step_lines: int
+    sections: int
+    cooking_verbs: int
+    score: float
+
+
+def score_description(text: str) -> DescriptionScore:
+    """
+    Быстрая эвристика: насколько описание похоже на полный рецепт.
+
+    Ингредиенты — строки с количеством и единицей или пункты списка
+    с количеством; шаги — нумерованные строки или строки с глаголами
+    готовки. Без шагов или без ингредиентов оценка не поднимется выше
+    половины: одного списка продуктов для рецепта мало.
+    """
+    lines = [line.strip() for line in (text or '').splitlines()]
+    lines = [line for line in lines if line]
+
+    ingredients = 0
+    steps = 0
+    verbs = 0
+    for line in lines:
+        has_qty = bool(_QUANTITY_RE.search(line))
+        has_verb = bool(_COOKING_VERB_RE.search(line))
+        verbs += has_verb
+        if _STEP_RE.match(line) and (has_verb or len(line) > 25):
+            steps += 1
+        elif has_qty or (_BULLET_RE.match(line) and len(line) < 60):
+            ingredients += 1
+    sections = len(_SECTION_RE.findall(text or ''))
+
+    ing_part = min(ingredients / _ENOUGH_INGREDIENTS, 1.0)
+    step_part = min(
+        max(steps, verbs // 2) / _ENOUGH_STEPS, 1.0
+    )
+    score = 0.45 * ing_part + 0.45 * step_part
+    score += 0.1 * min(sections / 2, 1.0)
+    if not ingredients or not (steps or verbs):
+        score = min(score, 0.5)
+
+    return DescriptionScore(
+        ingredient_lines=ingredients,
+        step_lines=steps,
+        sections=sections,
+        cooking_verbs=verbs,
+        score=round(score, 3),
+    )
+
+
+def recipe_signal(line: str) -> int:
+    """Вес строки для рецепта: количество с единицей — 2, глагол — 1."""
+    return (
+        2 * bool(_QUANTITY_RE.search(line))
+        + bool(_COOKING_VERB_RE.search(line))
+    )
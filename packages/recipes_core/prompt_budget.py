@@ -0,0 +1,225 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import re
+import threading
+import time
+from typing import Any, Optional
+
+from packages.recipes_core.description_classifier import recipe_signal
+
+logger = logging.getLogger(__name__)
+
+_URL_RE = re.compile(r'https?://\S+|www\.\S+', re.IGNORECASE)
+_TAG_RE = re.compile(r'(?<!\w)[#@][\w.]+', re.UNICODE)
+_EMOJI_RE = re.compile(
+    '['
+    '\U0001F000-\U0001FAFF'  # эмодзи, пиктограммы, флаги
+    '\U00002600-\U000027BF'  # символы и дингбаты
+    '\U0000FE0F\U0000200D'  # селекторы вариантов и ZWJ
+    ']+'
+)
+_SPACES_RE = re.compile(r'[ \t]+')
+_SENTENCE_RE = re.compile(r'(?<=[.!?…])\s+|\n+')
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# похожесть по словам, начиная с которой предложение считаем повтором
+_DUPLICATE_JACCARD = 0.8
+# с каким количеством предыдущих предложений сравниваем
+_DUPLICATE_WINDOW = 50
+
+
+# через сколько секунд повторять загрузку словаря после неудачи
+_ENCODING_RETRY_AFTER = 600.0
+
+_encoding: Optional[Any] = None
+_encoding_failed_at: Optional[float] = None
+_encoding_lock = threading.Lock()
+
+
+def ensure_tokenizer() -> None:
+    """
+    Загружает словарь cl100k_base (при первом вызове tiktoken может
+    скачать его из сети — поэтому не из event loop'а). Неудача не
+    кэшируется навсегда: повторим не раньше чем через
+    _ENCODING_RETRY_AFTER, а пока считаем токены оценочно.
+    """
+    global _encoding, _encoding_failed_at
+    if _encoding is not None:
+        return
+    with _encoding_lock:
+        if _encoding is not None:
+            return
+        failed_at = _encoding_failed_at
+        if (
+            failed_at is not None
+            and time.monotonic() - failed_at < _ENCODING_RETRY_AFTER
+        ):
+            return
+        try:
+            import tiktoken
+
+            _encoding = tiktoken.get_encoding('cl100k_base')
+            _encoding_failed_at = None
+        except Exception as e:
+            # нет пакета или словаря (офлайн-образ) — считаем приблизительно
+            _encoding_failed_at = time.monotonic()
+            logger.warning(
+                'tiktoken недоступен, токены считаем оценочно: %s', e
+            )
+
+
+async def warmup_tokenizer() -> None:
+    """ensure_tokenizer в потоке — для старта и async-кода."""
+    if _encoding is None:
+        await asyncio.to_thread(ensure_tokenizer)
+
+
+def count_tokens(text: str) -> int:
+    """
+    Токены по cl100k_base. Токенизатор DeepSeek другой, но для бюджета
+    важна не точность, а порядок величины. Сам словарь не грузит —
+    пока ensure_tokenizer не отработал, оценка по длине.
+    """
+    enc = _encoding
+    if enc is None:
+        return len(text) // 3 + 1
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def clean_description(text: str) -> str:
+    """Убирает из подписи ссылки, хэштеги, упоминания, эмодзи и повторы."""
+    lines: list[str] = []
+    seen: set[str] = set()
+    for line in (text or '').splitlines():
+        line = _URL_RE.sub(' ', line)
+        line = _TAG_RE.sub(' ', line)
+        line = _EMOJI_RE.sub(' ', line)
+        line = _SPACES_RE.sub(' ', line).strip(' -–—|•·')
+        key = line.lower()
+        if not line or key in seen:
+            continue
+        seen.add(key)
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def split_sentences(text: str) -> list[str]:
+    return [
+        s.strip() for s in _SENTENCE_RE.split(text or '') if s and s.strip()
+    ]
+
+
+def dedupe_sentences(sentences: list[str]) -> list[str]:
+    """
+    Выбрасывает почти одинаковые предложения (Whisper на музыке и
+    паузах любит повторять одну фразу десятки раз).
+    """
+    kept: list[str] = []
+    recent: list[frozenset[str]] = []
+    for sentence in sentences:
+        words = frozenset(w.lower() for w in _WORD_RE.findall(sentence))
+        if not words:
+            continue
+        duplicate = any(
+            len(words & prev) / len(words | prev) >= _DUPLICATE_JACCARD
+            for prev in recent
+        )
+        if duplicate:
+            continue
+        kept.append(sentence)
+        recent.append(words)
+        if len(recent) > _DUPLICATE_WINDOW:
+            recent.pop(0)
+    return kept
+
+
+def _split_words(text: str, limit: int) -> list[str]:
+    """Режет текст по словам на куски не длиннее limit токенов."""
+    pieces: list[str] = []
+    current: list[str] = []
+    used = 0
+    for word in text.split():
+        cost = count_tokens(word) + 1
+        if cost > limit:
+            # одно «слово» длиннее бюджета (склеенный мусор) — обрезаем
+            word = word[:max(1, limit * 3)]
+            cost = limit
+        if current and used + cost > limit:
+            pieces.append(' '.join(current))
+            current, used = [], 0
+        current.append(word)
+        used += cost
+    if current:
+        pieces.append(' '.join(current))
+    return pieces
+
+
+def _split_oversized(sentences: list[str], limit: int) -> list[str]:
+    """
+    Элементы длиннее limit токенов дробит на предложения, а если и
+    этого мало — на куски по словам, чтобы их не выбросить целиком.
+    """
+    result: list[str] = []
+    for sentence in sentences:
+        if count_tokens(sentence) + 1 <= limit:
+            result.append(sentence)
+            continue
+        parts = split_sentences(sentence)
+        if len(parts) > 1:
+            result.extend(_split_oversized(parts, limit))
+        else:
+            result.extend(_split_words(sentence, limit))
+    return result
+
+
+def _fit_sentences(sentences: list[str], budget: int) -> list[str]:
+    """
+    Оставляет предложения в пределах бюджета токенов: сначала самые
+    «рецептурные» (количества, глаголы готовки), при равенстве — более
+    ранние. Исходный порядок сохраняется; слишком длинные элементы
+    предварительно дробятся (_split_oversized).
+    """
+    if budget <= 0:
+        return []
+    sentences = _split_oversized(sentences, budget)
+    costs = [count_tokens(s) + 1 for s in sentences]
+    if sum(costs) <= budget:
+        return sentences
+
+    order = sorted(
+        range(len(sentences)),
+        key=lambda i: (-recipe_signal(sentences[i]), i),
+    )
+    chosen: set[int] = set()
+    used = 0
+    for i in order:
+        if used + costs[i] > budget:
+            continue
+        chosen.add(i)
+        used += costs[i]
+    return [s for i, s in enumerate(sentences) if i in chosen]
+
+
+def compact_inputs(
+    description: str, transcript: str, budget: int
+) -> tuple[str, str]:
+    """
+    Ужимает описание и транскрипт до бюджета токенов на пользовательскую
+    часть промпта. Описание чистится от шума и получает не больше
+    половины бюджета, остаток — транскрипт без повторов, с приоритетом
+    предложений про ингредиенты и действия.
+    """
+    description = clean_description(description)
+    sentences = dedupe_sentences(split_sentences(transcript))
+
+    desc_lines = description.splitlines()
+    desc_cost = count_tokens(description)
+    if desc_cost > budget // 2:
+        desc_lines = _fit_sentences(desc_lines, budget // 2)
+        description = '\n'.join(desc_lines)
+        desc_cost = count_tokens(description)
+
+    sentences = _fit_sentences(sentences, max(0, budget - desc_cost))
+    return description, ' '.join(sentences)
@@ -1,3 +1,6 @@
+# Меняйте при любой правке промпта: входит в ключ кэша ответов LLM
+PROMPT_VERSION = 1
+
 SYSTEM_PROMPT_RU = (
     'You are a data extraction assistant. '
     'Always respond in Russian, regardless of the '
@@ -1,49 +1,161 @@
 from __future__ import annotations
 
 import asyncio
+import inspect
 import logging
+import time
 from functools import partial
-from typing import Protocol
+from typing import (
+    TYPE_CHECKING,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Optional,
+    Protocol,
+    cast,
+)
 
-from packages.recipes_core.deepseek_parsers import RecipeExtraction, parse_llm_answer
+from packages.common_settings import settings
+from packages.metrics import metrics
+from packages.recipes_core.deepseek_parsers import (
+    IncrementalRecipeParser,
+    RecipeExtraction,
+    parse_llm_answer,
+)
+from packages.recipes_core.prompt_budget import (
+    compact_inputs,
+    count_tokens,
+    ensure_tokenizer,
+    warmup_tokenizer,
+)
 from packages.recipes_core.promts import SYSTEM_PROMPT_RU
 
+if TYPE_CHECKING:
+    from packages.integrations.deepseek_api import ChatMessages, ChatUsage
+
 logger = logging.getLogger(__name__)
 
 
 class ChatClient(Protocol):
     def chat(
-            self, messages: list[dict], *, temperature: float = 0.2,
+            self, messages: ChatMessages, *, temperature: float = 0.2,
             timeout: float | None = 30.0
     ) -> str: ...
 
 
+class AsyncChatClient(Protocol):
+    async def chat(
+            self, messages: ChatMessages, *, temperature: float = 0.2,
+            timeout: float | None = None,
+            usage: Optional[ChatUsage] = None
+    ) -> str: ...
+
+
+class StreamingChatClient(AsyncChatClient, Protocol):
+    def chat_stream(
+            self, messages: ChatMessages, *, temperature: float = 0.2,
+            timeout: float | None = None,
+            usage: Optional[ChatUsage] = None
+    ) -> AsyncIterator[str]: ...
+
+
+# колбэк (раздел, текст): раздел ответа LLM уже дописан
+SectionCallback = Callable[[str, str], Awaitable[None]]
+
+
 class LLMRecipeExtractor:
     """
     Use-case: отправить два текста в LLM и распарсить ответ в доменную модель.
     """
-    def __init__(self, chat_client: ChatClient):
+    def __init__(
+            self, chat_client: ChatClient | AsyncChatClient, *,
+            token_budget: int = settings.deepseek.prompt_token_budget
+    ):
         self.chat = chat_client
+        self.token_budget = token_budget
 
-    def extract_sync(
-            self, *, description: str, recognized_text: str
-    ) -> RecipeExtraction:
-        messages = [
+    def _messages(
+            self, description: str, recognized_text: str
+    ) -> list[dict[str, str]]:
+        # длинные транскрипты и подписи с хэштегами ужимаем до бюджета:
+        # меньше задержка и цена, реже ломается формат ответа
+        before = count_tokens(description) + count_tokens(recognized_text)
+        description, recognized_text = compact_inputs(
+            description, recognized_text, self.token_budget
+        )
+        after = count_tokens(description) + count_tokens(recognized_text)
+        metrics.incr('llm.prompt.tokens_before', before)
+        metrics.incr('llm.prompt.tokens_after', after)
+        logger.debug('LLM: вход ужат %s → %s токенов', before, after)
+        return [
             {'role': 'system', 'content': SYSTEM_PROMPT_RU},
             {'role': 'user', 'content': f'Description: {description}'},
             {'role': 'user', 'content': f'Recognized Text: {recognized_text}'},
         ]
+
+    def extract_sync(
+            self, *, description: str, recognized_text: str
+    ) -> RecipeExtraction:
+        ensure_tokenizer()
+        messages = self._messages(description, recognized_text)
         logger.debug('LLM: отправка запроса...')
-        raw = self.chat.chat(messages, temperature=0.0)
+        raw = cast(ChatClient, self.chat).chat(messages, temperature=0.0)
         logger.debug('LLM: ответ получен, длина=%s', len(raw))
         return parse_llm_answer(raw)
 
     async def extract(
-            self, *, description: str, recognized_text: str
+            self, *, description: str, recognized_text: str,
+            on_section: Optional[SectionCallback] = None
     ) -> RecipeExtraction:
+        """
+        on_section — если клиент умеет stream, разделы (название, шаги,
+        ингредиенты) отдаются в колбэк сразу, как только дописаны.
+        """
+        await warmup_tokenizer()
+        if on_section is not None and hasattr(self.chat, 'chat_stream'):
+            return await self._extract_streaming(
+                description, recognized_text, on_section
+            )
+        if inspect.iscoroutinefunction(self.chat.chat):
+            # асинхронный клиент: в потоке только подготовка промпта
+            # (токенизация и дедупликация не должны держать event loop)
+            messages = await asyncio.to_thread(
+                self._messages, description, recognized_text
+            )
+            logger.debug('LLM: отправка запроса...')
+            raw = await cast(AsyncChatClient, self.chat).chat(
+                messages, temperature=0.0
+            )
+            logger.debug('LLM: ответ получен, длина=%s', len(raw))
+            return parse_llm_answer(raw)
+
         loop = asyncio.get_running_loop()
         fn = partial(
             self.extract_sync,
             description=description,
             recognized_text=recognized_text)
         return await loop.run_in_executor(None, fn)
+
+    async def _extract_streaming(
+            self, description: str, recognized_text: str,
+            on_section: SectionCallback
+    ) -> RecipeExtraction:
+        client = cast(StreamingChatClient, self.chat)
+        messages = await asyncio.to_thread(
+            self._messages, description, recognized_text
+        )
+        parser = IncrementalRecipeParser()
+        started = time.monotonic()
+        first = True
+        logger.debug('LLM: отправка запроса (stream)...')
+        async for delta in client.chat_stream(messages, temperature=0.0):
+            for section, text in parser.feed(delta):
+                if first:
+                    metrics.observe(
+                        'llm.first_section', time.monotonic() - started
+                    )
+                    first = False
+                await on_section(section, text)
+        result = parser.finish()
+        logger.debug('LLM: ответ получен, длина=%s', len(result.raw))
+        return result
@@ -0,0 +1,141 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+from typing import AsyncIterator, Optional
+
+from redis.asyncio import Redis
+
+from packages.common_settings import settings
+from packages.integrations.deepseek_api import (
+    AsyncDeepSeekClient,
+    ChatMessages,
+    ChatUsage,
+)
+from packages.metrics import metrics
+from packages.recipes_core.deepseek_parsers import parse_llm_answer
+from packages.recipes_core.promts import PROMPT_VERSION
+from packages.redis.repository import LLMResponseCacheRepository
+
+logger = logging.getLogger(__name__)
+
+_SPACES_RE = re.compile(r'\s+')
+
+
+def prompt_hash(
+        model: str, temperature: float, messages: ChatMessages
+) -> str:
+    """
+    Ключ кэша: модель, версия промпта, температура и сообщения
+    с нормализованными пробелами (перевод строки в подписи ролика
+    не должен давать промах).
+    """
+    payload = {
+        'model': model,
+        'prompt_version': PROMPT_VERSION,
+        'temperature': round(float(temperature), 3),
+        'messages': [
+            [m.get('role', ''),
+             _SPACES_RE.sub(' ', str(m.get('content', ''))).strip()]
+            for m in messages
+        ],
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class CachedChatClient:
+    """
+    Обёртка над AsyncDeepSeekClient с кэшем сырых ответов в Redis
+    (LLMResponseCacheRepository): повторное извлечение из тех же
+    описания и транскрипта не тратит ни токенов, ни времени LLM.
+
+    Метрики: llm.cache.hit / .miss, llm.cache.tokens_saved.
+    Ошибки Redis не ломают запрос — просто идём в LLM.
+    """
+
+    def __init__(
+            self, client: AsyncDeepSeekClient, redis: Redis, *,
+            max_entries: int = settings.deepseek.cache_max_entries
+    ):
+        self.client = client
+        self.redis = redis
+        self.max_entries = max_entries
+
+    @property
+    def model(self) -> str:
+        return self.client.model
+
+    async def chat(
+            self, messages: ChatMessages, *,
+            temperature: float = 0.2, timeout: float | None = None,
+            usage: Optional[ChatUsage] = None
+    ) -> str:
+        key = prompt_hash(self.model, temperature, messages)
+        cached = await self._get(key)
+        if cached is not None:
+            return cached
+
+        usage = usage or ChatUsage()
+        content = await self.client.chat(
+            messages, temperature=temperature, timeout=timeout, usage=usage
+        )
+        await self._set(key, content, usage)
+        return content
+
+    async def chat_stream(
+            self, messages: ChatMessages, *,
+            temperature: float = 0.2, timeout: float | None = None,
+            usage: Optional[ChatUsage] = None
+    ) -> AsyncIterator[str]:
+        """Попадание отдаётся одним куском, промах — стримом из LLM."""
+        key = prompt_hash(self.model, temperature, messages)
+        cached = await self._get(key)
+        if cached is not None:
+            yield cached
+            return
+
+        usage = usage or ChatUsage()
+        parts: list[str] = []
+        async for delta in self.client.chat_stream(
+            messages, temperature=temperature, timeout=timeout, usage=usage
+        ):
+            parts.append(delta)
+            yield delta
+        await self._set(key, ''.join(parts).strip(), usage)
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
+
+    # ---------- внутренние хелперы ----------
+
+    async def _get(self, key: str) -> Optional[str]:
+        try:
+            data = await LLMResponseCacheRepository.get(self.redis, key)
+        except Exception as e:
+            logger.warning('Кэш LLM недоступен: %s', e)
+            return None
+        if data is None:
+            metrics.incr('llm.cache.miss')
+            return None
+        metrics.incr('llm.cache.hit')
+        metrics.incr('llm.cache.tokens_saved', data.get('tokens', 0))
+        logger.debug('♻️ Ответ LLM из кэша: %s', key)
+        return str(data['content'])
+
+    async def _set(self, key: str, content: str, usage: ChatUsage) -> None:
+        # обрезанный или пустой ответ (таймаут, сбой формата) не кэшируем,
+        # иначе он будет отдаваться вместо повторного запроса
+        if not content or not parse_llm_answer(content).is_usable:
+            metrics.incr('llm.cache.skip_unusable')
+            return
+        try:
+            await LLMResponseCacheRepository.set(
+                self.redis, key,
+                {'content': content, 'tokens': usage.total_tokens},
+                self.max_entries,
+            )
+        except Exception as e:
+            logger.warning('Не удалось сохранить ответ LLM в кэш: %s', e)
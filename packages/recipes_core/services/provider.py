@@ -1,10 +1,14 @@
 from __future__ import annotations
 
-from packages.integrations.deepseek_api import DeepSeekClient
+from typing import Optional
 
-from .extract_recipe import LLMRecipeExtractor
+from packages.integrations.deepseek_api import get_deepseek_client
 
+from .extract_recipe import AsyncChatClient, LLMRecipeExtractor
 
-def get_default_extractor() -> LLMRecipeExtractor:
-    client = DeepSeekClient()  # берёт ключ/URL/модель из settings
-    return LLMRecipeExtractor(chat_client=client)
+
+def get_default_extractor(
+        client: Optional[AsyncChatClient] = None
+) -> LLMRecipeExtractor:
+    # общий долгоживущий клиент (ключ/URL/модель из settings)
+    return LLMRecipeExtractor(chat_client=client or get_deepseek_client())
@@ -46,3 +46,59 @@ class RedisKeys:
             f'{cls.PREFIX}:user:{user_id}:category'
             f':{category_id}:recipes_ids_titles'
         )
+
+    @classmethod
+    def video_queue_users(cls) -> str:
+        return f'{cls.PREFIX}:video_queue:users'
+
+    @classmethod
+    def video_queue_user(cls, user_id: int | str) -> str:
+        return f'{cls.PREFIX}:video_queue:user:{user_id}'
+
+    @classmethod
+    def video_queue_processing(cls) -> str:
+        return f'{cls.PREFIX}:video_queue:processing'
+
+    @classmethod
+    def video_job(cls, job_id: str) -> str:
+        return f'{cls.PREFIX}:video_job:{job_id}'
+
+    @classmethod
+    def video_queue_attempts(cls) -> str:
+        return f'{cls.PREFIX}:video_queue:attempts'
+
+    @classmethod
+    def video_source(cls, source_hash: str) -> str:
+        return f'{cls.PREFIX}:video_source:{source_hash}'
+
+    @classmethod
+    def inflight_lock(cls, key_hash: str) -> str:
+        return f'{cls.PREFIX}:lock:inflight:{key_hash}'
+
+    @classmethod
+    def transcript(cls, model: str, fingerprint: str) -> str:
+        return f'{cls.PREFIX}:transcript:{model}:{fingerprint}'
+
+    @classmethod
+    def llm_response(cls, prompt_hash: str) -> str:
+        return f'{cls.PREFIX}:llm_response:{prompt_hash}'
+
+    @classmethod
+    def llm_response_index(cls) -> str:
+        return f'{cls.PREFIX}:llm_response:index'
+
+    @classmethod
+    def download_bucket(cls, platform: str) -> str:
+        return f'{cls.PREFIX}:download:{platform}:bucket'
+
+    @classmethod
+    def download_slots(cls, platform: str) -> str:
+        return f'{cls.PREFIX}:download:{platform}:slots'
+
+    @classmethod
+    def video_info(cls, url_hash: str) -> str:
+        return f'{cls.PREFIX}:video_info:{url_hash}'
+
+    @classmethod
+    def video_file(cls, content_hash: str) -> str:
+        return f'{cls.PREFIX}:video_file:{content_hash}'
@@ -1,6 +1,8 @@
+import hashlib
 import json
 import logging
-from typing import Dict, List, Optional, Tuple
+import time
+from typing import Any, Awaitable, Dict, List, Optional, Tuple, cast
 
 from redis.asyncio import Redis
 
@@ -235,3 +237,531 @@ class CategoryCacheRepository:
         """ Удаляет кэш всех категорий. """
         await r.delete(RedisKeys.all_category())
         logger.debug(f'❌ Запись {RedisKeys.all_category()} удалена из кэша')
+
+
+class VideoInfoCacheRepository:
+    """
+    Кэш метаданных ролика (probe без скачивания) по URL запроса:
+    id, длительность, оценка размера, описание, канонический URL.
+    """
+
+    @staticmethod
+    def _url_hash(url: str) -> str:
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+    @classmethod
+    async def get(cls, r: Redis, url: str) -> Optional[dict[str, Any]]:
+        """ Вернёт метаданные или None, если кэша нет. """
+        raw = await r.get(RedisKeys.video_info(cls._url_hash(url)))
+        if raw is None:
+            return None
+        try:
+            data = json.loads(raw)
+            if isinstance(data, dict):
+                return data
+        except Exception:
+            # битые данные — игнорируем
+            pass
+        return None
+
+    @classmethod
+    async def set(cls, r: Redis, url: str, data: dict[str, Any]) -> None:
+        """ Сохраняет метаданные с TTL. """
+        await r.setex(
+            RedisKeys.video_info(cls._url_hash(url)),
+            ttl.VIDEO_INFO,
+            json.dumps(data, ensure_ascii=False),
+        )
+
+
+class VideoFileCacheRepository:
+    """
+    Горячий кэш sha256 ролика -> file_id в канале хранения (полный
+    индекс — таблица video_files в Postgres).
+    """
+
+    @classmethod
+    async def get(cls, r: Redis, content_hash: str) -> Optional[str]:
+        raw = await r.get(RedisKeys.video_file(content_hash))
+        if raw is None:
+            return None
+        return str(raw)
+
+    @classmethod
+    async def set(cls, r: Redis, content_hash: str, file_id: str) -> None:
+        await r.setex(
+            RedisKeys.video_file(content_hash), ttl.VIDEO_FILE, file_id
+        )
+
+
+class VideoJobQueueRepository:
+    """
+    Очередь задач обработки видео в Redis с честным распределением
+    между пользователями (round-robin):
+      - у каждого пользователя свой список job_id;
+      - общий список пользователей, у которых есть задачи, крутится по кругу;
+      - взятые в работу задачи лежат в ZSET processing со score = дедлайн
+        аренды; просроченные возвращаются в очередь.
+    """
+
+    # KEYS: users, user_queue, job; ARGV: job_id, payload, ttl, user_id, front
+    _ENQUEUE_SCRIPT = """
+    redis.call('SET', KEYS[3], ARGV[2], 'EX', ARGV[3])
+    if ARGV[5] == '1' then
+      redis.call('LPUSH', KEYS[2], ARGV[1])
+    else
+      redis.call('RPUSH', KEYS[2], ARGV[1])
+    end
+    if not redis.call('LPOS', KEYS[1], ARGV[4]) then
+      redis.call('RPUSH', KEYS[1], ARGV[4])
+    end
+    return redis.call('LLEN', KEYS[2])
+    """
+
+    # KEYS: users, user_queue, processing; ARGV: user_id, deadline
+    # Пользователь уже переставлен в конец круга (LMOVE), скрипт берёт
+    # его задачу и убирает его из круга, если задач больше нет.
+    _POP_SCRIPT = """
+    local job = redis.call('LPOP', KEYS[2])
+    if redis.call('LLEN', KEYS[2]) == 0 then
+      redis.call('LREM', KEYS[1], 0, ARGV[1])
+    end
+    if job then
+      redis.call('ZADD', KEYS[3], ARGV[2], job)
+    end
+    return job
+    """
+
+    # KEYS: processing, job, users, user_queue, attempts
+    # ARGV: job_id, user_id, max_attempts, count_attempt
+    # 0 — задачу уже забрал другой процесс (или её нет), 1 — вернули
+    # в очередь, 2 — удалили после max_attempts
+    _REQUEUE_SCRIPT = """
+    if redis.call('ZREM', KEYS[1], ARGV[1]) == 0 then
+      return 0
+    end
+    if redis.call('EXISTS', KEYS[2]) == 0 then
+      redis.call('HDEL', KEYS[5], ARGV[1])
+      return 0
+    end
+    local attempts = tonumber(redis.call('HGET', KEYS[5], ARGV[1]) or '0')
+    if ARGV[4] == '1' then
+      attempts = redis.call('HINCRBY', KEYS[5], ARGV[1], 1)
+    end
+    if attempts >= tonumber(ARGV[3]) then
+      redis.call('DEL', KEYS[2])
+      redis.call('HDEL', KEYS[5], ARGV[1])
+      return 2
+    end
+    redis.call('LPUSH', KEYS[4], ARGV[1])
+    if not redis.call('LPOS', KEYS[3], ARGV[2]) then
+      redis.call('RPUSH', KEYS[3], ARGV[2])
+    end
+    return 1
+    """
+
+    @classmethod
+    async def enqueue(
+        cls, r: Redis, job_id: str, user_id: int, payload: dict[str, Any],
+        *, front: bool = False
+    ) -> int:
+        """
+        Кладёт задачу в очередь пользователя.
+        Возвращает длину очереди пользователя после добавления.
+        """
+        length = await cast('Awaitable[Any]', r.eval(
+            cls._ENQUEUE_SCRIPT, 3,
+            RedisKeys.video_queue_users(),
+            RedisKeys.video_queue_user(user_id),
+            RedisKeys.video_job(job_id),
+            job_id,
+            json.dumps(payload, ensure_ascii=False),
+            str(ttl.VIDEO_JOB),
+            str(user_id),
+            '1' if front else '0',
+        ))
+        logger.debug(f'📥 Video job {job_id} queued for user {user_id}')
+        return int(length)
+
+    @classmethod
+    async def pop_next(cls, r: Redis, lease_seconds: int) -> Optional[str]:
+        """
+        Берёт следующую задачу (round-robin по пользователям) и помечает
+        её как взятую в работу до now + lease_seconds. Очередь
+        пользователя и ZSET processing меняются одним скриптом.
+        """
+        users = RedisKeys.video_queue_users()
+        for _ in range(int(await r.llen(users))):
+            # пользователь уходит в конец круга — следующий вызов
+            # начнёт с другого
+            uid = await r.lmove(users, users, 'LEFT', 'RIGHT')
+            if uid is None:
+                return None
+            job_id = await cast('Awaitable[Any]', r.eval(
+                cls._POP_SCRIPT, 3,
+                users,
+                RedisKeys.video_queue_user(str(uid)),
+                RedisKeys.video_queue_processing(),
+                str(uid),
+                str(time.time() + lease_seconds),
+            ))
+            if job_id:
+                return str(job_id)
+        return None
+
+    @classmethod
+    async def get_job(
+        cls, r: Redis, job_id: str
+    ) -> Optional[dict[str, Any]]:
+        """ Вернёт payload задачи или None, если его нет/он битый. """
+        raw = await r.get(RedisKeys.video_job(job_id))
+        if raw is None:
+            return None
+        try:
+            data = json.loads(raw)
+            if isinstance(data, dict):
+                return data
+        except Exception:
+            # битые данные — игнорируем
+            pass
+        return None
+
+    @classmethod
+    async def update_job(
+        cls, r: Redis, job_id: str, payload: dict[str, Any]
+    ) -> None:
+        """ Перезаписывает payload задачи, сохраняя TTL. """
+        await r.set(
+            RedisKeys.video_job(job_id),
+            json.dumps(payload, ensure_ascii=False),
+            xx=True, keepttl=True,
+        )
+
+    @classmethod
+    async def touch(cls, r: Redis, job_id: str, lease_seconds: int) -> None:
+        """ Продлевает аренду задачи (heartbeat воркера). """
+        await r.zadd(
+            RedisKeys.video_queue_processing(),
+            {job_id: time.time() + lease_seconds},
+            xx=True,
+        )
+
+    @classmethod
+    async def release(cls, r: Redis, job_id: str) -> None:
+        """
+        Отпускает задачу без выполнения (например, при остановке бота):
+        score 0 — аренда истекла, но не по вине задачи; ближайший
+        requeue_expired вернёт её в очередь, не считая попытку.
+        """
+        await r.zadd(RedisKeys.video_queue_processing(), {job_id: 0}, xx=True)
+
+    @classmethod
+    async def ack(cls, r: Redis, job_id: str) -> None:
+        """ Задача завершена (успешно или окончательно неуспешно). """
+        pipe = r.pipeline(transaction=True)
+        pipe.zrem(RedisKeys.video_queue_processing(), job_id)
+        pipe.delete(RedisKeys.video_job(job_id))
+        pipe.hdel(RedisKeys.video_queue_attempts(), job_id)
+        await pipe.execute()
+
+    @classmethod
+    async def requeue_expired(
+        cls, r: Redis, max_attempts: int
+    ) -> Tuple[int, int]:
+        """
+        Возвращает в начало очереди пользователя задачи с истёкшей арендой.
+        Задачи, исчерпавшие max_attempts, удаляются; отпущенные через
+        release() попыткой не считаются. Каждая задача переносится
+        одним скриптом — падение посередине её не теряет.
+        Возвращает (возвращено, удалено).
+        """
+        processing = RedisKeys.video_queue_processing()
+        expired = cast(list[tuple[Any, float]], await r.zrangebyscore(
+            processing, '-inf', time.time(), withscores=True
+        ))
+        requeued = dropped = 0
+        for member, score in expired:
+            job_id = str(member)
+            payload = await cls.get_job(r, job_id)
+            user_id = str(payload.get('user_id', '')) if payload else ''
+            result = await cast('Awaitable[Any]', r.eval(
+                cls._REQUEUE_SCRIPT, 5,
+                processing,
+                RedisKeys.video_job(job_id),
+                RedisKeys.video_queue_users(),
+                RedisKeys.video_queue_user(user_id),
+                RedisKeys.video_queue_attempts(),
+                job_id,
+                user_id,
+                str(max_attempts),
+                '1' if score > 0 else '0',
+            ))
+            if int(result) == 1:
+                requeued += 1
+            elif int(result) == 2:
+                logger.warning(
+                    f'❌ Video job {job_id} dropped after '
+                    f'{max_attempts} attempts'
+                )
+                dropped += 1
+        return requeued, dropped
+
+    @classmethod
+    async def user_queue_length(cls, r: Redis, user_id: int) -> int:
+        """ Сколько задач пользователя ожидает в очереди. """
+        return int(await r.llen(RedisKeys.video_queue_user(user_id)))
+
+    @classmethod
+    async def position(cls, r: Redis, user_id: int, job_id: str) -> int:
+        """
+        Оценка количества задач, которые будут взяты в работу раньше
+        данной (с учётом round-robin между пользователями).
+        """
+        k = cast(Optional[int], await r.lpos(
+            RedisKeys.video_queue_user(user_id), job_id
+        ))
+        if k is None:
+            return 0
+        users = await r.lrange(RedisKeys.video_queue_users(), 0, -1)
+        me = str(user_id)
+        my_idx = users.index(me) if me in users else len(users)
+        pipe = r.pipeline(transaction=False)
+        for uid in users:
+            pipe.llen(RedisKeys.video_queue_user(str(uid)))
+        lengths = await pipe.execute()
+        ahead = int(k)
+        for idx, (uid, length) in enumerate(zip(users, lengths)):
+            if uid == me:
+                continue
+            # пользователи раньше нас в круге успеют отдать k + 1 задач,
+            # пользователи после нас — k задач
+            turns = int(k) + 1 if idx < my_idx else int(k)
+            ahead += min(int(length), turns)
+        return ahead
+
+
+class VideoSourceCacheRepository:
+    """
+    Кэш результата обработки ролика по каноническому URL источника:
+    file_id видео в канале, описание, транскрипт и извлечённый рецепт.
+    Повторная ссылка на тот же ролик не проходит тяжёлые стадии.
+    """
+
+    @staticmethod
+    def _source_hash(canonical_url: str) -> str:
+        return hashlib.sha1(canonical_url.encode('utf-8')).hexdigest()
+
+    @classmethod
+    async def get(
+        cls, r: Redis, canonical_url: str
+    ) -> Optional[dict[str, Any]]:
+        """ Вернёт сохранённый результат или None, если кэша нет. """
+        raw = await r.get(RedisKeys.video_source(cls._source_hash(
+            canonical_url
+        )))
+        if raw is None:
+            return None
+        try:
+            data = json.loads(raw)
+            if isinstance(data, dict) and data.get('file_id'):
+                return data
+        except Exception:
+            # битые данные — игнорируем
+            pass
+        return None
+
+    @classmethod
+    async def set(
+        cls, r: Redis, canonical_url: str, data: dict[str, Any]
+    ) -> None:
+        """ Сохраняет результат обработки ролика с TTL. """
+        await r.setex(
+            RedisKeys.video_source(cls._source_hash(canonical_url)),
+            ttl.VIDEO_SOURCE,
+            json.dumps(data, ensure_ascii=False),
+        )
+        logger.debug(f'✅ Video source {canonical_url} cached')
+
+
+class TranscriptCacheRepository:
+    """
+    Кэш транскриптов по отпечатку аудио (см. audio_fingerprint).
+    Один и тот же звук, пришедший по разным ссылкам (репосты, зеркала),
+    распознаётся один раз. TTL продлевается при каждом попадании,
+    так что живут часто встречающиеся записи, а остальные вытесняются.
+    """
+
+    @classmethod
+    async def get(
+        cls, r: Redis, model: str, fingerprint: str
+    ) -> Optional[str]:
+        """ Вернёт транскрипт или None, если кэша нет. """
+        raw = await r.getex(
+            RedisKeys.transcript(model, fingerprint), ex=ttl.TRANSCRIPT
+        )
+        return None if raw is None else str(raw)
+
+    @classmethod
+    async def set(
+        cls, r: Redis, model: str, fingerprint: str, transcript: str
+    ) -> None:
+        """ Сохраняет транскрипт с TTL. """
+        await r.setex(
+            RedisKeys.transcript(model, fingerprint),
+            ttl.TRANSCRIPT,
+            transcript,
+        )
+        logger.debug(f'✅ Transcript {fingerprint} cached')
+
+
+class LLMResponseCacheRepository:
+    """
+    Кэш сырых ответов LLM по хэшу запроса (модель, версия промпта,
+    температура, нормализованные сообщения).
+    Размер ограничен: индекс-ZSET хранит время последнего обращения,
+    при переполнении удаляются давно не используемые ответы (LRU).
+    """
+
+    @classmethod
+    async def get(
+        cls, r: Redis, prompt_hash: str
+    ) -> Optional[dict[str, Any]]:
+        """ Вернёт сохранённый ответ или None; обновляет время доступа. """
+        raw = await r.getex(
+            RedisKeys.llm_response(prompt_hash), ex=ttl.LLM_RESPONSE
+        )
+        if raw is None:
+            return None
+        await r.zadd(
+            RedisKeys.llm_response_index(), {prompt_hash: time.time()}
+        )
+        try:
+            data = json.loads(raw)
+            if isinstance(data, dict) and data.get('content'):
+                return data
+        except Exception:
+            # битые данные — игнорируем
+            pass
+        return None
+
+    @classmethod
+    async def set(
+        cls, r: Redis, prompt_hash: str, data: dict[str, Any],
+        max_entries: int
+    ) -> None:
+        """
+        Сохраняет ответ; вытесняет самые старые сверх max_entries.
+        Ключи ответов удаляются отдельными командами, а не из Lua:
+        скрипт может трогать только ключи, переданные в KEYS (кластер).
+        """
+        index = RedisKeys.llm_response_index()
+        now = time.time()
+        pipe = r.pipeline(transaction=True)
+        pipe.set(
+            RedisKeys.llm_response(prompt_hash),
+            json.dumps(data, ensure_ascii=False),
+            ex=ttl.LLM_RESPONSE,
+        )
+        pipe.zadd(index, {prompt_hash: now})
+        # ответы, к которым не обращались дольше TTL, уже истекли сами
+        pipe.zremrangebyscore(index, '-inf', now - ttl.LLM_RESPONSE)
+        pipe.zcard(index)
+        *_, size = await pipe.execute()
+
+        excess = int(size) - max_entries
+        if excess > 0:
+            old = await r.zrange(index, 0, excess - 1)
+            if old:
+                pipe = r.pipeline(transaction=False)
+                pipe.delete(*(RedisKeys.llm_response(h) for h in old))
+                pipe.zrem(index, *old)
+                await pipe.execute()
+        logger.debug(
+            f'✅ LLM response {prompt_hash} cached, '
+            f'evicted={max(excess, 0)}'
+        )
+
+
+class DownloadLimiterRepository:
+    """
+    Лимиты скачивания по платформам, общие для всех процессов:
+      - token bucket (HASH tokens/ts): не чаще rate запросов в секунду
+        с запасом burst;
+      - слоты (ZSET token → дедлайн аренды): не больше N загрузок
+        одновременно; упавший процесс не держит слот дольше аренды.
+    Время берётся из Redis (TIME), чтобы часы процессов не расходились.
+    """
+
+    # KEYS: bucket; ARGV: rate (в секунду), burst, ttl
+    _TAKE_TOKEN_SCRIPT = """
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local rate = tonumber(ARGV[1])
+    local burst = tonumber(ARGV[2])
+    local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+    local tokens = tonumber(b[1]) or burst
+    local ts = tonumber(b[2]) or now
+    tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+    local wait = 0
+    if tokens >= 1 then
+      tokens = tokens - 1
+    else
+      wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts',
+               tostring(now))
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+    return tostring(wait)
+    """
+
+    # KEYS: slots; ARGV: token, max, lease
+    _ACQUIRE_SLOT_SCRIPT = """
+    local now = tonumber(redis.call('TIME')[1])
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+    local deadline = now + tonumber(ARGV[3])
+    if redis.call('ZSCORE', KEYS[1], ARGV[1]) then
+      redis.call('ZADD', KEYS[1], deadline, ARGV[1])
+      return 1
+    end
+    if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[2]) then
+      redis.call('ZADD', KEYS[1], deadline, ARGV[1])
+      redis.call('EXPIRE', KEYS[1], ARGV[3])
+      return 1
+    end
+    return 0
+    """
+
+    @classmethod
+    async def take_token(
+        cls, r: Redis, platform: str, per_minute: float, burst: int
+    ) -> float:
+        """
+        Берёт токен. Вернёт 0, если взят, иначе сколько секунд ждать
+        до следующей попытки.
+        """
+        wait = await cast('Awaitable[Any]', r.eval(
+            cls._TAKE_TOKEN_SCRIPT, 1,
+            RedisKeys.download_bucket(platform),
+            per_minute / 60.0,
+            burst,
+            ttl.DOWNLOAD_SLOT,
+        ))
+        return float(wait)
+
+    @classmethod
+    async def acquire_slot(
+        cls, r: Redis, platform: str, token: str, limit: int
+    ) -> bool:
+        """ Занимает (или продлевает уже занятый) слот загрузки. """
+        ok = await cast('Awaitable[Any]', r.eval(
+            cls._ACQUIRE_SLOT_SCRIPT, 1,
+            RedisKeys.download_slots(platform),
+            token,
+            limit,
+            ttl.DOWNLOAD_SLOT,
+        ))
+        return bool(ok)
+
+    @classmethod
+    async def release_slot(cls, r: Redis, platform: str, token: str) -> None:
+        await r.zrem(RedisKeys.download_slots(platform), token)
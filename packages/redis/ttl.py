@@ -4,3 +4,11 @@ RECIPE_COUNT_LONG = 24 * 60 * 60  # 24 часа
 LOCK = 10  # 10 секунд
 USER_CATEGORIES = 24 * 60 * 60  # 24 часа
 USER_RECIPES_IDS_AND_TITLES = 10 * 60  # 10 минут
+VIDEO_JOB = 24 * 60 * 60  # 24 часа
+VIDEO_SOURCE = 30 * 24 * 60 * 60  # 30 дней
+INFLIGHT_LOCK = 2 * 60  # 2 минуты, продлевается пока идёт обработка
+TRANSCRIPT = 30 * 24 * 60 * 60  # 30 дней, продлевается при попадании
+LLM_RESPONSE = 30 * 24 * 60 * 60  # 30 дней
+DOWNLOAD_SLOT = 2 * 60  # 2 минуты, продлевается пока идёт загрузка
+VIDEO_INFO = 24 * 60 * 60  # 24 часа
+VIDEO_FILE = 7 * 24 * 60 * 60  # 7 дней, источник истины — Postgres
@@ -18,3 +18,14 @@ async def release_lock(r: Redis, name: str, token: str) -> None:
     else return 0 end
     """
     await cast('Awaitable[Any]', r.eval(script, 1, name, token))
+
+
+async def extend_lock(r: Redis, name: str, token: str, ttl: int) -> bool:
+    # атомарно продлеваем лок только владельцем
+    script = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+      return redis.call('EXPIRE', KEYS[1], ARGV[2])
+    else return 0 end
+    """
+    res = await cast('Awaitable[Any]', r.eval(script, 1, name, token, ttl))
+    return bool(res)
@@ -0,0 +1,14 @@
+import os
+
+# settings валидируются при импорте — для тестов хватает заглушек
+for _name, _value in {
+    'DB_HOST': 'localhost', 'DB_USER': 'test', 'DB_PASSWORD': 'test',
+    'DB_NAME': 'test', 'REDIS_HOST': 'localhost', 'REDIS_PORT': '6379',
+    'REDIS_PASSWORD': 'test', 'REDIS_DB': '0',
+    'TELEGRAM_BOT_TOKEN': 'test', 'TELEGRAM_CHAT_ID': '1',
+    'TELEGRAM_ADMIN_ID': '1', 'DEEPSEEK_API_KEY': 'test',
+    'DEEPSEEK_BASE_URL': 'http://localhost', 'DEEPSEEK_MODEL': 'test',
+    'ADMIN_LOGIN': 'test', 'ADMIN_PASSWORD': 'test',
+    'WEBHOOK_SLUG': 'test', 'WEBHOOK_SECRET_TOKEN': 'test',
+}.items():
+    os.environ.setdefault(_name, _value)
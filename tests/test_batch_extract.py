@@ -0,0 +1,85 @@
+import asyncio
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Optional
+
+import pytest
+
+from packages.db.repository import RecipeRepository
+from packages.recipes_core.batch_extract import BatchExtractor
+from packages.recipes_core.services.extract_recipe import LLMRecipeExtractor
+
+ANSWER = 'Название рецепта: Суп\nРецепт:\n1. Сварить\nИнгредиенты:\n- вода\n'
+
+
+class FakeChatClient:
+    """AsyncChatClient без сети: считает одновременные вызовы."""
+
+    def __init__(self, fail_on: str) -> None:
+        self.fail_on = fail_on
+        self.active = 0
+        self.max_active = 0
+        self.calls = 0
+
+    async def chat(
+        self, messages: Any, *, temperature: float = 0.2,
+        timeout: Optional[float] = None, usage: Any = None
+    ) -> str:
+        self.calls += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(0.02)
+            if any(self.fail_on in m['content'] for m in messages):
+                raise RuntimeError('LLM недоступен')
+            return ANSWER
+        finally:
+            self.active -= 1
+
+
+class FakeDatabase:
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[None]:
+        yield None
+
+
+def _recipe(recipe_id: int) -> SimpleNamespace:
+    return SimpleNamespace(
+        id=recipe_id, title=f'Рецепт {recipe_id}', description='',
+        ingredients=[],
+    )
+
+
+@pytest.mark.asyncio
+async def test_concurrency_capped_and_failure_isolated(
+    monkeypatch, tmp_path: Path
+):
+    recipes = [_recipe(i) for i in range(1, 11)]
+
+    async def get_chunk_after(
+        session: Any, last_id: int, size: int
+    ) -> list[SimpleNamespace]:
+        return [r for r in recipes if r.id > last_id][:size]
+
+    monkeypatch.setattr(
+        RecipeRepository, 'get_chunk_after', get_chunk_after
+    )
+    client = FakeChatClient(fail_on='Рецепт 3\n')
+    runner = BatchExtractor(
+        FakeDatabase(),  # type: ignore[arg-type]
+        LLMRecipeExtractor(client),
+        checkpoint_path=tmp_path / 'checkpoint.json',
+        chunk_size=10,
+        concurrency=3,
+        rps=0,
+        dry_run=True,
+    )
+
+    cp = await runner.run()
+
+    assert client.calls == 10
+    assert 1 < client.max_active <= 3
+    assert cp.failed == [3]
+    assert cp.done == 9
+    assert cp.last_id == 10
@@ -0,0 +1,39 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from packages.media import transcription
+from packages.media.transcription import (
+    TranscriptionEngine,
+    TranscriptionError,
+)
+
+
+@pytest.mark.asyncio
+async def test_timeout_recycles_pool_after_other_calls(monkeypatch):
+    def fake_worker(audio: str) -> str:
+        time.sleep(0.3 if audio == 'slow' else 0.1)
+        return f'text:{audio}'
+
+    monkeypatch.setattr(transcription, '_transcribe_in_worker', fake_worker)
+    engine = TranscriptionEngine(workers=2, queue_size=0, timeout=1.0)
+    executor = ThreadPoolExecutor(max_workers=2)
+    engine._executor = executor  # type: ignore[assignment]
+    recycled: list[int] = []
+    monkeypatch.setattr(
+        engine, '_recycle', lambda: recycled.append(engine._inflight)
+    )
+
+    async def slow() -> None:
+        with pytest.raises(TranscriptionError):
+            await engine.transcribe('slow', timeout=0.05)
+        # соседний вызов ещё в пуле — пул не трогаем
+        assert recycled == []
+
+    _, text = await asyncio.gather(slow(), engine.transcribe('fast'))
+
+    assert text == 'text:fast'
+    assert recycled == [0]
+    executor.shutdown(wait=True)
@@ -0,0 +1,51 @@
+import asyncio
+from typing import Any, Optional
+
+import pytest
+
+from bot.app.services.video_queue import VideoJobQueue
+from packages.redis.repository import VideoJobQueueRepository
+
+
+@pytest.mark.asyncio
+async def test_worker_survives_redis_error_in_ack(monkeypatch):
+    pending = ['job-1', 'job-2']
+    processed: list[str] = []
+    acked: list[str] = []
+    ack_failures = [ConnectionError('redis down')]
+
+    async def pop_next(r: Any, lease: int) -> Optional[str]:
+        return pending.pop(0) if pending else None
+
+    async def get_job(r: Any, job_id: str) -> dict[str, Any]:
+        return {'id': job_id}
+
+    async def ack(r: Any, job_id: str) -> None:
+        if ack_failures:
+            raise ack_failures.pop()
+        acked.append(job_id)
+
+    async def run_job(self: VideoJobQueue, payload: dict[str, Any]) -> None:
+        processed.append(payload['id'])
+
+    monkeypatch.setattr(VideoJobQueueRepository, 'pop_next', pop_next)
+    monkeypatch.setattr(VideoJobQueueRepository, 'get_job', get_job)
+    monkeypatch.setattr(VideoJobQueueRepository, 'ack', ack)
+    monkeypatch.setattr(VideoJobQueue, '_run_job', run_job)
+
+    queue = VideoJobQueue(
+        app=None, redis=None, workers=1, poll_interval=0.01,  # type: ignore
+    )
+    worker = asyncio.create_task(queue._worker(0))
+    try:
+        for _ in range(200):
+            if 'job-2' in acked:
+                break
+            await asyncio.sleep(0.01)
+    finally:
+        worker.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await worker
+
+    assert processed == ['job-1', 'job-2']
+    assert acked == ['job-2']